@@ -0,0 +1,208 @@
+import numpy as np
+
+
+def label_mask(label_ids):
+    """Combine ids of labels into a bitmask with a bit set for each label."""
+    mask = 0
+    for label_id in label_ids:
+        mask |= 1 << label_id
+    return mask
+
+
+def label_ids(mask):
+    """Iterate over ids of labels set in a bitmask, in increasing order."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+class Annotation:
+    """Labeled interval of samples, with labels as a bitmask of label ids."""
+
+    __slots__ = ("start", "end", "labels", "color", "region")
+
+    def __init__(self, start, end, labels, color):
+        self.start = min(start, end)
+        self.end = max(start, end)
+        self.labels = labels
+        self.color = color
+        # editable region showing the annotation while it is used
+        self.region = None
+
+    def __repr__(self):
+        return (
+            f"(annotation {list(label_ids(self.labels))}, "
+            f"[{self.start}, {self.end}])"
+        )
+
+
+class AnnotationIndex:
+    """Annotations sorted by start, bounds changed only by :meth:`move`."""
+
+    def __init__(self, annotations=()):
+        self._annotations = []
+        # bounds and colors are mirrored in arrays, colors never updated
+        self._rebuild([])
+        self.extend(annotations)
+
+    def __len__(self):
+        return len(self._annotations)
+
+    def __iter__(self):
+        return iter(self._annotations)
+
+    def __getitem__(self, index):
+        return self._annotations[index]
+
+    def extend(self, annotations):
+        annotations = self._annotations + list(annotations)
+        annotations.sort(key=lambda annotation: annotation.start)
+        self._rebuild(annotations)
+
+    def add(self, annotation):
+        i = int(np.searchsorted(self._starts, annotation.start, "right"))
+        self._annotations.insert(i, annotation)
+        self._starts = np.insert(self._starts, i, annotation.start)
+        self._ends = np.insert(self._ends, i, annotation.end)
+        self._colors = np.insert(self._colors, i, annotation.color.rgba())
+        self._max_length = max(
+            self._max_length, annotation.end - annotation.start
+        )
+
+    def position(self, annotation):
+        """Get position of indexed annotation in the index."""
+        i = int(np.searchsorted(self._starts, annotation.start, "left"))
+        while self._annotations[i] is not annotation:
+            i += 1
+        return i
+
+    def remove(self, annotation):
+        i = self.position(annotation)
+        del self._annotations[i]
+        self._starts = np.delete(self._starts, i)
+        self._ends = np.delete(self._ends, i)
+        self._colors = np.delete(self._colors, i)
+
+    def remove_all(self, annotations):
+        if len(annotations) < 2:
+            for annotation in annotations:
+                self.remove(annotation)
+            return
+        removed = set(map(id, annotations))
+        self._rebuild([a for a in self._annotations if id(a) not in removed])
+
+    def move(self, annotation, start, end):
+        self.remove(annotation)
+        annotation.start, annotation.end = min(start, end), max(start, end)
+        self.add(annotation)
+
+    def clear(self):
+        self._rebuild([])
+
+    def _rebuild(self, annotations):
+        count = len(annotations)
+        self._annotations = annotations
+        self._starts = np.fromiter(
+            (a.start for a in annotations), float, count
+        )
+        self._ends = np.fromiter((a.end for a in annotations), float, count)
+        self._colors = np.fromiter(
+            (a.color.rgba() for a in annotations), np.uint32, count
+        )
+        self._max_length = (
+            float((self._ends - self._starts).max()) if count > 0 else 0
+        )
+
+    def span(self, x_start, x_end):
+        """Get positions bounding annotations that may overlap range."""
+        return (
+            int(
+                np.searchsorted(
+                    self._starts, x_start - self._max_length, "left"
+                )
+            ),
+            int(np.searchsorted(self._starts, x_end, "right")),
+        )
+
+    def overlapping(self, x_start, x_end):
+        """Get annotations overlapping range, in order of their starts."""
+        first, last = self.span(x_start, x_end)
+        return [
+            self._annotations[first + i]
+            for i in np.flatnonzero(self._ends[first:last] >= x_start)
+        ]
+
+    def at(self, x):
+        """Get annotations containing position ``x``."""
+        return self.overlapping(x, x)
+
+    def next(self, x):
+        """Get the first annotation starting after ``x``, if any."""
+        i = int(np.searchsorted(self._starts, x, "right"))
+        return self._annotations[i] if i < len(self._annotations) else None
+
+    def previous(self, x):
+        """Get the last annotation starting before ``x``, if any."""
+        i = int(np.searchsorted(self._starts, x, "left"))
+        return self._annotations[i - 1] if i > 0 else None
+
+    def masks(self):
+        """Get label bitmasks of annotations as array, in index order."""
+        return np.fromiter(
+            (annotation.labels for annotation in self._annotations),
+            object,
+            len(self._annotations),
+        )
+
+    def intervals(self):
+        """Get starts and ends of annotations, as arrays not to be changed."""
+        return self._starts, self._ends
+
+    def colors(self):
+        """Get RGBA colors of annotations as array, in index order."""
+        return self._colors
+
+
+class LabelIndex:
+    """Annotations listed under each of their labels, which must not change."""
+
+    def __init__(self):
+        self._annotations = {}
+
+    def __contains__(self, label_id):
+        return label_id in self._annotations
+
+    def get(self, label_id):
+        """Get annotations having label with id ``label_id``."""
+        return list(self._annotations.get(label_id, {}).values())
+
+    def having(self, mask):
+        """Get annotations having all labels set in bitmask ``mask``."""
+        candidates = [
+            self._annotations.get(label_id, {}) for label_id in label_ids(mask)
+        ]
+        if len(candidates) == 0:
+            return []
+        return [
+            annotation
+            for annotation in min(candidates, key=len).values()
+            if annotation.labels & mask == mask
+        ]
+
+    def add(self, annotation):
+        for label_id in label_ids(annotation.labels):
+            self._annotations.setdefault(label_id, {})[
+                id(annotation)
+            ] = annotation
+
+    def remove(self, annotation):
+        for label_id in label_ids(annotation.labels):
+            annotations = self._annotations.get(label_id)
+            if annotations is not None:
+                annotations.pop(id(annotation), None)
+                if len(annotations) == 0:
+                    del self._annotations[label_id]
+
+    def clear(self):
+        self._annotations.clear()
@@ -0,0 +1,304 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+LABEL_COLUMN = "Label"
+LABEL_NAMES = ("label 0", "label 1", "label 2", "label 3")
+FORMATS = ("csv", "parquet", "feather")
+
+
+def max_rss_bytes():
+    """Get the peak resident memory of the process, if available."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in kilobytes, except on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class Recorder:
+    """Timings and peak memory of named benchmark steps."""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.steps = []
+
+    @contextmanager
+    def step(self, name, **info):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        record = dict(name=name, seconds=None, **info)
+        start = time.perf_counter()
+        yield record
+        record["seconds"] = time.perf_counter() - start
+        if self.trace_memory:
+            record["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+        record["max_rss_bytes"] = max_rss_bytes()
+        self.steps.append(record)
+
+    def timed(self, obj, method):
+        """Record calls of ``method`` of ``obj`` as steps."""
+        fn = getattr(obj, method)
+
+        def wrapper(*args, **kwargs):
+            with self.step(method):
+                return fn(*args, **kwargs)
+
+        setattr(obj, method, wrapper)
+
+
+def wait_for_task(app, window):
+    """Process events until the background task of window finishes."""
+    while window.worker is not None:
+        app.processEvents()
+        time.sleep(0.001)
+    app.processEvents()
+
+
+def render(app, window):
+    """Process pending events and paint the plots."""
+    app.processEvents()
+    window.pg_main_plot.grab()
+    window.pg_timeline.grab()
+
+
+def run_case(app, path, args, recorder, output_dir):
+    from .chronnotate import Chronnotate
+
+    errors = []
+    window = Chronnotate()
+    window.show_load_error = lambda path, error=None: errors.append(error)
+    window.show_save_error = lambda path, error: errors.append(error)
+    recorder.timed(window, "fill_elements_from_data")
+    window.resize(1600, 900)
+    window.show()
+    app.processEvents()
+    try:
+        with recorder.step("load_file"):
+            window.load_file(path, 0, LABEL_COLUMN, args.lazy, args.compact)
+            wait_for_task(app, window)
+        if len(errors) > 0:
+            raise RuntimeError(f"Could not load {path}: {errors[0]}")
+
+        model = window.lv_data_columns.model()
+        plot_columns = min(args.plot_columns, model.rowCount())
+        with recorder.step("update_plot", columns=plot_columns):
+            for row in range(plot_columns):
+                window.update_plot(model.createIndex(row, 0))
+                wait_for_task(app, window)
+            render(app, window)
+
+        rng = np.random.default_rng(args.seed)
+        rows = len(window.data)
+        starts = np.sort(rng.integers(max(rows, 1), size=args.regions))
+        ends = starts + rng.integers(1, max(rows // 1000, 2), size=len(starts))
+        labels = np.array(LABEL_NAMES, dtype=object)[
+            rng.integers(len(LABEL_NAMES), size=len(starts))
+        ]
+        with recorder.step("add_annotations", regions=args.regions):
+            window.add_annotations(starts, ends, labels)
+            render(app, window)
+
+        view_box = window.pg_main_plot.plotItem.vb
+        x_start, x_end = view_box.viewRange()[0]
+        step = (x_end - x_start) / 10
+        counters = dict(window.view_sync.counters)
+        with recorder.step("pan", pans=args.pans) as record:
+            for i in range(args.pans):
+                view_box.setXRange(
+                    x_start + i * step, x_end + i * step, padding=0
+                )
+                render(app, window)
+            # range changes received and applied by the overview sync
+            record["view_sync"] = {
+                key: value - counters[key]
+                for key, value in window.view_sync.counters.items()
+            }
+
+        with recorder.step("create_labeled_data"):
+            window.create_labeled_data()
+
+        output_path = os.path.join(output_dir, "labeled.csv")
+        with recorder.step("save_file"):
+            window.save_labeled_file(output_path)
+            wait_for_task(app, window)
+        if len(errors) > 0:
+            raise RuntimeError(f"Could not save {output_path}: {errors[0]}")
+        return dict(
+            regions=len(window.region_layer.annotations),
+            scene_items=len(window.pg_main_plot.scene().items()),
+        )
+    finally:
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="chronnotate-benchmark",
+        description="Time loading, plotting, annotating and saving data in "
+        "Chronnotate, printing timings and peak memory as JSON.",
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help="files to benchmark with a label column named "
+        f"'{LABEL_COLUMN}', generated when not given; annotations in an "
+        "existing '<name>.annotations.csv' next to a file are loaded with "
+        "it and change what is benchmarked",
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[100_000, 1_000_000],
+        help="rows of generated files",
+    )
+    parser.add_argument(
+        "--columns", type=int, default=8, help="channels of generated files"
+    )
+    parser.add_argument(
+        "--dtypes",
+        default="float64",
+        help="comma-separated dtypes of channels of generated files",
+    )
+    parser.add_argument(
+        "--gaps",
+        type=int,
+        default=0,
+        help="NaN gaps in each channel of generated files",
+    )
+    parser.add_argument(
+        "--segments",
+        type=int,
+        default=100,
+        help="labeled segments of generated files",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="csv",
+        help="format of generated files",
+    )
+    parser.add_argument(
+        "--plot-columns", type=int, default=4, help="columns to plot"
+    )
+    parser.add_argument(
+        "--regions", type=int, default=1000, help="annotations to add"
+    )
+    parser.add_argument(
+        "--pans", type=int, default=20, help="pans of the main plot"
+    )
+    parser.add_argument(
+        "--lazy", action="store_true", help="load columns on demand"
+    )
+    parser.add_argument(
+        "--compact",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="compact numeric types",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="record peak memory allocated in each step, slowing it down",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "-o", "--output", help="file to write results to, default stdout"
+    )
+    return parser.parse_args(argv)
+
+
+def environment():
+    import PyQt6.QtCore
+    import pyqtgraph as pg
+
+    return dict(
+        python=platform.python_version(),
+        platform=platform.platform(),
+        processor=platform.processor(),
+        cpus=os.cpu_count(),
+        numpy=np.__version__,
+        pandas=pd.__version__,
+        pyqtgraph=pg.__version__,
+        qt=PyQt6.QtCore.QT_VERSION_STR,
+        qt_platform=os.environ.get("QT_QPA_PLATFORM"),
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    # settings are read on import, so files opened by the benchmark are not
+    # stored in the cache unless it is enabled explicitly
+    os.environ.setdefault("CHRONNOTATE_CACHE_DIR", "")
+    from PyQt6.QtWidgets import QApplication
+
+    from .synthetic import generate
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    if args.trace_memory:
+        tracemalloc.start()
+    results = []
+    with tempfile.TemporaryDirectory(prefix="chronnotate-benchmark-") as tmp:
+        cases = [(path, {}) for path in args.files]
+        for rows in [] if len(args.files) > 0 else args.rows:
+            path = os.path.join(tmp, f"recording-{rows}.{args.format}")
+            generate(
+                path,
+                rows,
+                channels=args.columns,
+                dtypes=tuple(args.dtypes.split(",")),
+                gaps=args.gaps,
+                segments=args.segments,
+                labels=len(LABEL_NAMES),
+                label_column=LABEL_COLUMN,
+                seed=args.seed,
+            )
+            cases.append((path, dict(rows=rows, columns=args.columns)))
+        for path, info in cases:
+            recorder = Recorder(args.trace_memory)
+            case = run_case(app, path, args, recorder, tmp)
+            results.append(
+                dict(
+                    file=path if len(info) == 0 else None,
+                    file_bytes=os.path.getsize(path),
+                    **info,
+                    **case,
+                    steps=recorder.steps,
+                )
+            )
+            print(f"benchmarked {path}", file=sys.stderr)
+    report = json.dumps(
+        dict(
+            environment=environment(),
+            options={k: v for k, v in vars(args).items() if k != "output"},
+            results=results,
+        ),
+        indent=2,
+    )
+    if args.output is None:
+        print(report)
+    else:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
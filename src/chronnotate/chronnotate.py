@@ -1,24 +1,46 @@
+import os
 import sys
 
 import numpy as np
 import pandas as pd
 import pyqtgraph as pg
-from pandas.api.types import is_numeric_dtype
-from PyQt6.QtCore import QEvent, Qt
+from PyQt6.QtCore import QEvent, Qt, QThreadPool
+from PyQt6.QtGui import QAction, QKeySequence
 from PyQt6.QtWidgets import (
     QAbstractItemView,
     QApplication,
     QDialog,
     QFileDialog,
+    QGraphicsItem,
     QMainWindow,
     QMessageBox,
+    QProgressBar,
+    QPushButton,
 )
 
-from . import gui_resources, settings  # noqa
+from . import gui_resources, instrumentation, settings  # noqa
+from .annotations import Annotation, label_mask
 from .chronnotate_main_window import Ui_main_window as ChronnotateMainWindow
-from .data_utils import find_subsegments
-from .elements import AnnotationRegion, ColorItemElement, ColorItemModel
+from .data_sources import is_columnar_file, open_data_source, save_labeled_csv
+from .data_utils import (
+    annotations_path,
+    find_subsegments,
+    label_codes,
+    read_annotations,
+    write_annotations,
+)
+from .decimation import MinMaxPyramid
+from .elements import (
+    ColorItemElement,
+    ColorItemModel,
+    DecimatedCurveItem,
+    FrameStatsOverlay,
+    RegionLayer,
+    mix_colors,
+)
 from .file_dialogs import OpenDialog
+from .utils import ViewSync
+from .workers import Worker
 
 
 class Chronnotate(QMainWindow, ChronnotateMainWindow):
@@ -29,12 +51,14 @@ class Chronnotate(QMainWindow, ChronnotateMainWindow):
         self.init_plots()
         self.init_labels()
         self.init_actions()
+        self.init_status_bar()
         self.data = None
+        self.data_path = ""
 
     def init_elements(self):
-        self.btn_deselect_all.clicked.connect(self.plot_deselect_all)
+        self.btn_deselect_all.clicked.connect(lambda: self.plot_deselect_all())
         self.btn_create_label.clicked.connect(lambda: self.create_label(None))
-        self.btn_delete_label.clicked.connect(self.delete_label)
+        self.btn_delete_label.clicked.connect(lambda: self.delete_label())
         self.lv_data_columns.doubleClicked.connect(self.update_plot)
         self.lv_data_columns.setEditTriggers(
             QAbstractItemView.EditTrigger.NoEditTriggers
@@ -50,11 +74,6 @@ class Chronnotate(QMainWindow, ChronnotateMainWindow):
         self.pg_timeline.setMouseEnabled(x=False, y=False)
         self.pg_main_plot.hideButtons()
 
-        self.annotation_regions = []
-        self.pg_main_plot.set_annotation_regions_requirements(
-            self.annotation_regions, self.lv_labels
-        )
-
     def init_plots(self):
         self.pg_main_plot.setBackground("white")
         self.pg_timeline.setBackground("white")
@@ -67,6 +86,17 @@ class Chronnotate(QMainWindow, ChronnotateMainWindow):
         self.pg_main_plot.addLegend()
         self.main_plot_items = {}
         self.timeline_plot_items = {}
+        self.pyramids = {}
+        self.view_sync = ViewSync(self.pg_main_plot)
+        self.region_layer = RegionLayer(self.pg_main_plot)
+        self.region_layer.update_visible(False)
+        self.pg_main_plot.set_annotation_regions_requirements(
+            self.region_layer, self.lv_labels
+        )
+        self.frame_stats = [
+            FrameStatsOverlay(self.pg_main_plot, self.region_layer),
+            FrameStatsOverlay(self.pg_timeline, view_sync=self.view_sync),
+        ]
 
     def init_labels(self):
         items = []
@@ -78,21 +108,123 @@ class Chronnotate(QMainWindow, ChronnotateMainWindow):
     def init_actions(self):
         self.action_open_file.triggered.connect(self.open_file)
         self.action_save_file.triggered.connect(self.save_file)
+        self.action_save_annotations.triggered.connect(self.save_annotations)
         self.action_exit.triggered.connect(self.close)
+        self.action_record_timings = QAction("Record Action Timings", self)
+        self.action_record_timings.setCheckable(True)
+        self.action_record_timings.toggled.connect(self.record_timings)
+        self.menuSettings.addAction(self.action_record_timings)
+        self.action_frame_stats = QAction("Show Rendering Statistics", self)
+        self.action_frame_stats.setCheckable(True)
+        self.action_frame_stats.setShortcut(QKeySequence("F12"))
+        self.action_frame_stats.toggled.connect(self.show_frame_stats)
+        self.menuSettings.addAction(self.action_frame_stats)
+        if settings.LOG_DIR != "":
+            self.action_record_timings.setChecked(True)
+
+    def record_timings(self, enabled):
+        if enabled:
+            recorder = instrumentation.enable(
+                settings.LOG_DIR or settings.DEFAULT_LOG_DIR,
+                settings.PROFILED_ACTIONS,
+            )
+            self.statusbar.showMessage(
+                f"Recording action timings to {recorder.directory}", 5000
+            )
+        else:
+            instrumentation.disable()
+
+    def show_frame_stats(self, enabled):
+        for overlay in self.frame_stats:
+            overlay.set_enabled(enabled)
+
+    def init_status_bar(self):
+        self.thread_pool = QThreadPool()
+        self.worker = None
+        self.task_action = None
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setMaximumWidth(200)
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.clicked.connect(self.cancel_task)
+        self.statusbar.addPermanentWidget(self.progress_bar)
+        self.statusbar.addPermanentWidget(self.btn_cancel)
+        self.progress_bar.hide()
+        self.btn_cancel.hide()
+
+    def start_task(
+        self, message, fn, *args, on_finished, on_failed, action=None
+    ):
+        """Run ``fn`` in thread pool, finishing ``action`` with the task."""
+        self.task_action = action
+        self.worker = Worker(fn, *args)
+        self.worker.signals.progress.connect(self.update_task_progress)
+        self.worker.signals.finished.connect(
+            lambda result: self.finish_task(on_finished, result)
+        )
+        self.worker.signals.failed.connect(
+            lambda error: self.finish_task(on_failed, error, status="failed")
+        )
+        self.worker.signals.cancelled.connect(
+            lambda: self.finish_task(
+                self.statusbar.showMessage,
+                f"{message} cancelled",
+                5000,
+                status="cancelled",
+            )
+        )
+        self.action_open_file.setEnabled(False)
+        self.action_save_file.setEnabled(False)
+        self.action_save_annotations.setEnabled(False)
+        self.statusbar.showMessage(message)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.btn_cancel.show()
+        self.thread_pool.start(self.worker)
+
+    def update_task_progress(self, fraction):
+        self.progress_bar.setValue(int(fraction * self.progress_bar.maximum()))
+
+    def cancel_task(self):
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def finish_task(self, callback, *args, status="finished"):
+        action, self.task_action = self.task_action, None
+        self.worker = None
+        self.progress_bar.hide()
+        self.btn_cancel.hide()
+        self.statusbar.clearMessage()
+        self.action_open_file.setEnabled(True)
+        self.action_save_file.setEnabled(True)
+        self.action_save_annotations.setEnabled(True)
+        if status != "finished":
+            # errors are shown in dialogs, which should not be timed
+            instrumentation.finish(action, status=status)
+            callback(*args)
+            return
+        try:
+            callback(*args)
+        finally:
+            instrumentation.finish(action, status=status)
 
     def open_file(self):
         path, _ = QFileDialog.getOpenFileName(
             self,
             "Select file with time-series data to load",
             "",
-            "All files (*);;CSV (*csv);;Text files (*txt)",
+            "All files (*);;CSV (*csv);;Text files (*txt);;"
+            "Parquet (*.parquet *.pq);;"
+            "Arrow/Feather (*.arrow *.feather *.ipc)",
         )
         if path != "":
-            settings_dialog = OpenDialog()
+            settings_dialog = OpenDialog(text_file=not is_columnar_file(path))
             if settings_dialog.exec() == QDialog.DialogCode.Accepted:
                 skip_lines = settings_dialog.get_skip_lines()
                 col_label = settings_dialog.get_label_column_name()
-                self.load_file(path, skip_lines, col_label)
+                lazy = settings_dialog.get_lazy_loading()
+                compact = settings_dialog.get_compact_types()
+                self.load_file(path, skip_lines, col_label, lazy, compact)
 
     def save_file(self):
         path, _ = QFileDialog.getSaveFileName(
@@ -101,110 +233,243 @@ class Chronnotate(QMainWindow, ChronnotateMainWindow):
             "",
             "All files (*);;CSV (*csv);;Text files (*txt)",
         )
+        if path != "" and self.data is not None:
+            self.save_labeled_file(path)
+
+    def save_labeled_file(self, path):
+        action = instrumentation.start("save_file")
+        starts, ends, labels = self.annotation_intervals()
+        self.start_task(
+            f"Saving {path}",
+            save_labeled_csv,
+            path,
+            self.data,
+            self.label_column,
+            starts,
+            ends,
+            labels,
+            on_finished=lambda _: self.statusbar.showMessage(
+                f"Saved {path}", 5000
+            ),
+            on_failed=lambda error: self.show_save_error(path, error),
+            action=action,
+        )
+
+    def save_annotations(self):
+        if self.data is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Select output file to save annotations",
+            annotations_path(self.data_path),
+            "All files (*);;CSV (*csv)",
+        )
         if path != "":
-            labeled_data = self.create_labeled_data()
-            labeled_data.to_csv(path, index=False)
+            try:
+                write_annotations(path, *self.annotation_intervals())
+                self.statusbar.showMessage(f"Saved {path}", 5000)
+            except Exception as e:
+                self.show_save_error(path, e)
 
-    def load_file(self, path, skip_lines, col_label):
+    def load_file(
+        self, path, skip_lines, col_label, lazy=False, compact=False
+    ):
+        action = instrumentation.start("open_file", lazy=lazy, compact=compact)
+        if len(col_label) > 0:
+            label_column = col_label
+        else:
+            label_column = settings.DEFAULT_LABEL_COLUMN
+        self.start_task(
+            f"Loading {path}",
+            open_data_source,
+            path,
+            skip_lines,
+            label_column,
+            lazy,
+            compact,
+            on_finished=lambda data: self.file_loaded(
+                path, data, label_column
+            ),
+            on_failed=lambda error: self.show_load_error(path, error),
+            action=action,
+        )
+
+    def file_loaded(self, path, data, label_column):
         try:
-            data = pd.read_csv(path, skiprows=skip_lines)
-            if len(col_label) > 0:
-                self.label_column = col_label
-            else:
-                self.label_column = settings.DEFAULT_LABEL_COLUMN
-            self.fill_elements_from_data(data)
-        except Exception:
-            QMessageBox.critical(
-                self, "File error", f"Could not load file {path}"
-            )
+            self.data_path = path
+            annotations = None
+            if os.path.exists(annotations_path(path)):
+                annotations = read_annotations(annotations_path(path))
+            self.label_column = label_column
+            self.fill_elements_from_data(data, annotations)
+        except Exception as e:
+            self.show_load_error(path, e)
+
+    def show_load_error(self, path, error=None):
+        message = f"Could not load file {path}"
+        if error is not None:
+            message += f"\n\n{error}"
+        QMessageBox.critical(self, "File error", message)
+
+    def show_save_error(self, path, error):
+        QMessageBox.critical(
+            self, "File error", f"Could not save file {path}\n\n{error}"
+        )
+
+    def annotation_intervals(self):
+        """Get starts, ends and labels of annotations as arrays."""
+        starts, ends = self.region_layer.intervals()
+        codes, masks = pd.factorize(self.region_layer.annotations.masks())
+        model = self.lv_labels.model()
+        texts = np.array(
+            [model.label_text(int(mask)) for mask in masks], dtype=object
+        )
+        labels = texts[codes]
+        return (
+            np.rint(starts).astype(np.int64),
+            np.rint(ends).astype(np.int64),
+            labels,
+        )
 
     def create_labeled_data(self):
-        labels = pd.Series(["" for _ in range(len(self.data))]).astype(
-            "string"
+        starts, ends, labels = self.annotation_intervals()
+        codes, categories = pd.factorize(labels)
+        labels = pd.Categorical.from_codes(
+            label_codes(len(self.data), starts, ends, codes),
+            categories=categories,
         )
-        for region in self.annotation_regions:
-            start, end = region.getRegion()
-            start = int(np.rint(start))
-            end = int(np.rint(end))
-            label = region.label
-            labels[start:end] = label
-        labeled_data = self.data.copy()
+        labeled_data = self.data.to_frame()
         labeled_data[self.label_column] = labels
         return labeled_data
 
-    def fill_elements_from_data(self, data: pd.DataFrame):
+    def fill_elements_from_data(self, data, annotations=None):
+        """Show columns of loaded data and annotations or its label column."""
+        self.remove_plots()
+        if self.data is not None:
+            self.data.close()
         self.data = data
         items = [
             ColorItemElement(col)
             for col in self.data.columns
-            if is_numeric_dtype(self.data[col]) and col != self.label_column
+            if self.data.is_numeric(col) and col != self.label_column
         ]
         model = ColorItemModel(items)
         self.lv_data_columns.setModel(model)
-        if self.label_column in self.data.columns:
-            segments = find_subsegments(self.data, self.label_column)
-            labels = self.data[self.label_column].dropna().unique()
-            label_colors = {}
-            for label in labels:
-                item = self.create_label(label)
-                label_colors[label] = item.color
-            for segment in segments:
-                rgn = AnnotationRegion(
-                    self.pg_main_plot,
-                    segment["label"],
-                    label_colors[segment["label"]],
-                    (segment["start"], segment["end"]),
-                )
-                self.pg_main_plot.plotItem.vb.sigYRangeChanged.connect(
-                    rgn.update_label_pos
-                )
-                rgn.select(True)
-                rgn.update_visible(False)
-                self.annotation_regions.append(rgn)
+        if annotations is None and self.label_column in self.data.columns:
+            starts, ends, codes, categories = find_subsegments(
+                self.data[self.label_column]
+            )
+            annotations = (starts, ends, categories[codes])
+        if annotations is not None:
+            self.add_annotations(*annotations)
+
+    def remove_plots(self):
+        """Remove curves of all plotted columns and the range view."""
+        for item in self.main_plot_items.values():
+            self.pg_main_plot.removeItem(item)
+        for item in self.timeline_plot_items.values():
+            self.pg_timeline.removeItem(item)
+        self.main_plot_items.clear()
+        self.timeline_plot_items.clear()
+        self.pyramids.clear()
+        if self.view_sync.region is not None:
+            self.view_sync.detach()
+            self.pg_timeline.removeItem(self.timeline_plot_range)
+        self.region_layer.update_visible(False)
+
+    def add_annotations(self, starts, ends, labels):
+        """Add annotations, creating labels missing from the list of labels."""
+        model = self.lv_labels.model()
+        codes, texts = pd.factorize(np.asarray(labels, dtype=object))
+        if np.any(codes < 0):
+            raise ValueError("Annotations with missing labels")
+        masks, colors = [], []
+        for text in texts:
+            items = [
+                model.find(label) or self.create_label(label)
+                for label in text.split(settings.LABEL_SEPARATOR)
+            ]
+            masks.append(label_mask(item.label_id for item in items))
+            colors.append(mix_colors([item.color for item in items]))
+        self.region_layer.add(
+            [
+                Annotation(start, end, masks[code], colors[code])
+                for start, end, code in zip(starts, ends, codes)
+            ]
+        )
 
     def update_plot(self, index):
         col = self.lv_data_columns.model().data(
             index, Qt.ItemDataRole.DisplayRole
         )
-        color = self.lv_data_columns.model().data(
-            index, Qt.ItemDataRole.DecorationRole
-        )
-        col_active = (
+        if not self.is_column_active(index) and col not in self.pyramids:
+            # the action is finished after the column is loaded and plotted
+            if self.worker is None:
+                values = self.data[col] if self.data.is_loaded(col) else None
+                self.start_task(
+                    f"Loading column {col}",
+                    self.prepare_column,
+                    col,
+                    values,
+                    on_finished=lambda result: self.column_loaded(
+                        index, col, *result
+                    ),
+                    on_failed=lambda error: self.show_load_error(
+                        self.data.path, error
+                    ),
+                    action=instrumentation.start("update_plot"),
+                )
+            return
+        action = instrumentation.start("update_plot")
+        try:
+            self.toggle_plot(index)
+        finally:
+            instrumentation.finish(action)
+
+    def is_column_active(self, index):
+        return (
             self.lv_data_columns.model().data(
                 index, Qt.ItemDataRole.BackgroundRole
             )
             == settings.LV_DATA_COLUMNS_COLOR_ACTIVE
         )
-        if not col_active:
+
+    def toggle_plot(self, index):
+        """Plot column with loaded pyramid, or remove its plot."""
+        col = self.lv_data_columns.model().data(
+            index, Qt.ItemDataRole.DisplayRole
+        )
+        color = self.lv_data_columns.model().data(
+            index, Qt.ItemDataRole.DecorationRole
+        )
+        if not self.is_column_active(index):
             self.lv_data_columns.model().setData(
                 index,
                 settings.LV_DATA_COLUMNS_COLOR_ACTIVE,
                 Qt.ItemDataRole.BackgroundRole,
             )
-            y = self.data[col]
-            x = np.arange(len(y))
-            self.main_plot_items[col] = self.pg_main_plot.plot(
-                x, y, pen=color, name=col
+            pyramid = self.pyramids[col]
+            self.main_plot_items[col] = DecimatedCurveItem(
+                self.pyramids[col], pen=color, name=col
             )
-            self.timeline_plot_items[col] = self.pg_timeline.plot(
-                x, y, pen=color
+            self.pg_main_plot.addItem(self.main_plot_items[col])
+            # overview is redrawn from cache unless its size changes
+            self.timeline_plot_items[col] = DecimatedCurveItem(
+                self.pyramids[col], pen=color
             )
+            self.timeline_plot_items[col].setCacheMode(
+                QGraphicsItem.CacheMode.DeviceCoordinateCache
+            )
+            self.pg_timeline.addItem(self.timeline_plot_items[col])
             if len(self.timeline_plot_items.keys()) == 1:
                 # add range view
-                range_len = len(y) / 10
+                range_len = len(pyramid) / 10
                 self.timeline_plot_range = pg.LinearRegionItem([0, range_len])
                 self.timeline_plot_range.setZValue(-10)
-                self.timeline_plot_range.setBounds([0, len(y)])
-                self.timeline_plot_range.sigRegionChanged.connect(
-                    self.update_plot_from_range
-                )
+                self.timeline_plot_range.setBounds([0, len(pyramid)])
                 self.pg_timeline.addItem(self.timeline_plot_range)
-                self.pg_main_plot.sigRangeChanged.connect(
-                    self.update_range_from_plot
-                )
-                self.update_plot_from_range()
-                for rgn in self.annotation_regions:
-                    rgn.update_visible(True)
+                self.view_sync.attach(self.timeline_plot_range)
+                self.region_layer.update_visible(True)
         else:
             self.lv_data_columns.model().setData(
                 index,
@@ -213,16 +478,28 @@ class Chronnotate(QMainWindow, ChronnotateMainWindow):
             )
             self.pg_main_plot.removeItem(self.main_plot_items[col])
             del self.main_plot_items[col]
+            del self.pyramids[col]
             self.pg_timeline.removeItem(self.timeline_plot_items[col])
             del self.timeline_plot_items[col]
             if len(self.timeline_plot_items.keys()) == 0:
                 # remove range view
+                self.view_sync.detach()
                 self.pg_timeline.removeItem(self.timeline_plot_range)
-                self.pg_main_plot.sigRangeChanged.disconnect()
-                self.timeline_plot_range.sigRegionChanged.disconnect()
-                for rgn in self.annotation_regions:
-                    rgn.update_visible(False)
+                self.region_layer.update_visible(False)
+
+    def prepare_column(self, col, values, progress=None, is_cancelled=None):
+        """Read column, unless its ``values`` are given, and build pyramid."""
+        if values is None:
+            values = self.data.read_column(col, progress, is_cancelled)
+        return values, MinMaxPyramid(values)
+
+    def column_loaded(self, index, col, values, pyramid):
+        if not self.data.is_loaded(col):
+            self.data.cache_column(col, values)
+        self.pyramids[col] = pyramid
+        self.toggle_plot(index)
 
+    @instrumentation.timed
     def plot_deselect_all(self):
         for i in range(self.lv_data_columns.model().rowCount()):
             index = self.lv_data_columns.model().createIndex(i, 0)
@@ -243,16 +520,16 @@ class Chronnotate(QMainWindow, ChronnotateMainWindow):
                 )
                 self.pg_main_plot.removeItem(self.main_plot_items[col])
                 del self.main_plot_items[col]
+                del self.pyramids[col]
                 self.pg_timeline.removeItem(self.timeline_plot_items[col])
                 del self.timeline_plot_items[col]
                 if len(self.timeline_plot_items.keys()) == 0:
                     # remove range view
+                    self.view_sync.detach()
                     self.pg_timeline.removeItem(self.timeline_plot_range)
-                    self.pg_main_plot.sigRangeChanged.disconnect()
-                    self.timeline_plot_range.sigRegionChanged.disconnect()
-        for rgn in self.annotation_regions:
-            rgn.update_visible(False)
+        self.region_layer.update_visible(False)
 
+    @instrumentation.timed
     def create_label(self, label=None):
         lbl_name = f"Label {self.label_counter}" if label is None else label
         self.label_counter += 1
@@ -264,47 +541,30 @@ class Chronnotate(QMainWindow, ChronnotateMainWindow):
             self.lv_labels.edit(index)
         return item
 
+    @instrumentation.timed
     def delete_label(self):
         model = self.lv_labels.model()
-        removing = True
-        while removing:
-            indexes = self.lv_labels.selectedIndexes()
-            if len(indexes) == 0:
-                removing = False
-            else:
-                label = model.data(indexes[0], Qt.ItemDataRole.DisplayRole)
-                model.removeItem(indexes[0].row())
-                regions_to_remove = []
-                for annotation_region in self.annotation_regions:
-                    labels = annotation_region.label.split(
-                        settings.LABEL_SEPARATOR
-                    )
-                    if label in labels:
-                        regions_to_remove.append(annotation_region)
-                for region in regions_to_remove:
-                    region.remove()
+        rows = {index.row() for index in self.lv_labels.selectedIndexes()}
+        annotations = {}
+        for row in sorted(rows, reverse=True):
+            label_id = model.items[row].label_id
+            for annotation in self.region_layer.label_index.get(label_id):
+                annotations[id(annotation)] = annotation
+            model.removeItem(row)
+        self.region_layer.remove(list(annotations.values()))
         self.lv_labels.clearSelection()
         self.lv_labels.setCurrentIndex(model.createIndex(-1, -1))
 
-    def update_plot_from_range(self):
-        self.pg_main_plot.setXRange(
-            *self.timeline_plot_range.getRegion(), padding=0
-        )
-
-    def update_range_from_plot(self):
-        self.timeline_plot_range.setRegion(
-            self.pg_main_plot.getViewBox().viewRange()[0]
-        )
-
     def update_annotation_regions_labels(self, index, _):
-        model = self.lv_labels.model()
-        old_label = model.items[index.row()].prev_label
-        new_label = model.data(index, Qt.ItemDataRole.DisplayRole)
-        for region in self.annotation_regions:
-            labels = region.label.split(settings.LABEL_SEPARATOR)
-            labels = [lab if lab != old_label else new_label for lab in labels]
-            label = settings.LABEL_SEPARATOR.join(labels)
-            region.update_label(label)
+        # annotations refer to labels by id, only their text is updated
+        self.region_layer.refresh_labels()
+
+    def closeEvent(self, event):
+        self.cancel_task()
+        self.thread_pool.waitForDone()
+        if self.data is not None:
+            self.data.close()
+        super().closeEvent(event)
 
     def eventFilter(self, obj, event: QEvent):
         if (
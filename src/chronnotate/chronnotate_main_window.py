@@ -115,6 +115,8 @@ class Ui_main_window(object):
         self.action_open_file.setObjectName("action_open_file")
         self.action_save_file = QtGui.QAction(parent=main_window)
         self.action_save_file.setObjectName("action_save_file")
+        self.action_save_annotations = QtGui.QAction(parent=main_window)
+        self.action_save_annotations.setObjectName("action_save_annotations")
         self.action_close_file = QtGui.QAction(parent=main_window)
         self.action_close_file.setObjectName("action_close_file")
         self.action_exit = QtGui.QAction(parent=main_window)
@@ -127,6 +129,7 @@ class Ui_main_window(object):
         self.action_plot_settings.setObjectName("action_plot_settings")
         self.menuFile.addAction(self.action_open_file)
         self.menuFile.addAction(self.action_save_file)
+        self.menuFile.addAction(self.action_save_annotations)
         self.menuFile.addAction(self.action_exit)
         self.menuSettings.addAction(self.action_plot_settings)
         self.menuHelp.addAction(self.action_tutorial)
@@ -158,6 +161,9 @@ class Ui_main_window(object):
         self.action_save_file.setText(
             _translate("main_window", "Save File with Annotations")
         )
+        self.action_save_annotations.setText(
+            _translate("main_window", "Save Annotations Only")
+        )
         self.action_close_file.setText(_translate("main_window", "Close File"))
         self.action_exit.setText(_translate("main_window", "Exit"))
         self.action_tutorial.setText(_translate("main_window", "Tutorial"))
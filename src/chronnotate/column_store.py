@@ -0,0 +1,413 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from .data_utils import compact_dtype
+from .settings import (
+    CACHE_DIR,
+    CACHE_MAX_BYTES,
+    CHUNK_BUDGET_BYTES,
+    CSV_SAMPLE_ROWS,
+)
+from .workers import OperationCancelled
+
+META_FILE = "meta.json"
+CODES_DTYPE = np.int32
+FINGERPRINT_BYTES = 1024**2
+
+
+class ColumnStore:
+    """Columns of a table kept in memory-mapped files on disk."""
+
+    def __init__(self, directory, temporary=False):
+        self.directory = directory
+        self.temporary = temporary
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        self.rows = meta["rows"]
+        self.source = meta.get("source")
+        self.columns = [column["name"] for column in meta["columns"]]
+        self._meta = {column["name"]: column for column in meta["columns"]}
+        self._arrays = {
+            column["name"]: self._map(column) for column in meta["columns"]
+        }
+
+    def _map(self, column):
+        dtype = np.dtype(column["dtype"])
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        path = os.path.join(self.directory, column["file"])
+        return np.memmap(path, dtype=dtype, mode="r", shape=(self.rows,))
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, col):
+        return self._column(col, slice(None))
+
+    def _column(self, col, rows):
+        if self.is_numeric(col):
+            return self._arrays[col][rows]
+        # text is stored as codes into categories, -1 marking missing values
+        return pd.Categorical.from_codes(
+            self._arrays[col][rows], categories=self._meta[col]["categories"]
+        )
+
+    def is_numeric(self, col):
+        return self._meta[col]["kind"] == "numeric"
+
+    def is_loaded(self, col):
+        # memory-mapped columns are always available
+        return True
+
+    def to_frame(self):
+        """Create DataFrame backed by the store, without copying columns."""
+        return pd.DataFrame(
+            {col: self[col] for col in self.columns}, copy=False
+        )
+
+    def iter_frames(self, rows):
+        """Iterate over the table in frames of ``rows`` rows."""
+        for start in range(0, self.rows, rows):
+            rows_slice = slice(start, start + rows)
+            yield pd.DataFrame(
+                {col: self._column(col, rows_slice) for col in self.columns},
+                copy=False,
+            )
+
+    def close(self):
+        self._arrays = {}
+        if self.temporary:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class _ColumnWriter:
+    def __init__(self, directory, index, name, kind, dtype, compact=False):
+        self.name = name
+        self.kind = kind
+        self.dtype = np.dtype(dtype)
+        self.file = f"{index}.bin"
+        self.path = os.path.join(directory, self.file)
+        self.rows = 0
+        self.categories = {}
+        self.compact = compact
+        self.compact_dtype = None
+        self.compact_bounds = None
+        self.handle = open(self.path, "wb")
+
+    def append(self, values: pd.Series):
+        if self.kind == "numeric" and not is_numeric_dtype(values):
+            self._convert_to_text()
+        if self.kind == "text":
+            self._write(self._encode(values))
+        else:
+            dtype = np.result_type(self.dtype, values.dtype)
+            if dtype != self.dtype:
+                self._cast(dtype)
+            self._write(values.to_numpy().astype(self.dtype, copy=False))
+
+    def _write(self, values):
+        np.ascontiguousarray(values).tofile(self.handle)
+        self.rows += len(values)
+        if not self.compact:
+            return
+        if values.dtype.kind in "iu":
+            # dtypes of chunks would combine into a wider one than needed
+            if len(values) > 0:
+                bounds = [values.min(), values.max()]
+                if self.compact_bounds is not None:
+                    bounds += self.compact_bounds
+                self.compact_bounds = [min(bounds), max(bounds)]
+            dtype = compact_dtype(
+                np.array(self.compact_bounds or [], dtype=values.dtype)
+            )
+        else:
+            dtype = compact_dtype(values)
+            if self.compact_dtype is not None:
+                dtype = np.result_type(self.compact_dtype, dtype)
+        self.compact_dtype = dtype
+
+    def _encode(self, values):
+        local_codes, uniques = pd.factorize(values)
+        mapping = np.array(
+            [
+                self.categories.setdefault(str(value), len(self.categories))
+                for value in uniques
+            ],
+            dtype=CODES_DTYPE,
+        )
+        codes = np.full(len(local_codes), -1, dtype=CODES_DTYPE)
+        valid = local_codes >= 0
+        codes[valid] = mapping[local_codes[valid]]
+        return codes
+
+    def _rewrite(self, convert, dtype):
+        """Rewrite already stored values in chunks with new dtype."""
+        self.handle.close()
+        old_path = self.path + ".old"
+        os.replace(self.path, old_path)
+        old_dtype, rows = self.dtype, self.rows
+        self.dtype = np.dtype(dtype)
+        self.rows = 0
+        self.compact_dtype = None
+        self.compact_bounds = None
+        self.handle = open(self.path, "wb")
+        if rows > 0:
+            old = np.memmap(old_path, dtype=old_dtype, mode="r")
+            step = max(1, CHUNK_BUDGET_BYTES // old_dtype.itemsize)
+            for start in range(0, rows, step):
+                self._write(convert(old[start : start + step]))
+            del old
+        os.remove(old_path)
+
+    def _cast(self, dtype):
+        self._rewrite(lambda values: values.astype(dtype), dtype)
+
+    def _convert_to_text(self):
+        self.kind = "text"
+        self._rewrite(
+            lambda values: self._encode(pd.Series(values, dtype=object)),
+            CODES_DTYPE,
+        )
+
+    def finish(self):
+        """Narrow stored values to their compact dtype, if enabled."""
+        if self.compact_dtype is not None and self.compact_dtype != self.dtype:
+            self._cast(self.compact_dtype)
+
+    def close(self):
+        self.handle.close()
+
+    def meta(self):
+        column = {
+            "name": self.name,
+            "kind": self.kind,
+            "dtype": self.dtype.str,
+            "file": self.file,
+        }
+        if self.kind == "text":
+            column["categories"] = list(self.categories)
+        return column
+
+
+def ingest_csv(
+    path,
+    skip_lines=0,
+    label_column=None,
+    compact=False,
+    directory=None,
+    chunk_bytes=CHUNK_BUDGET_BYTES,
+    progress=None,
+    is_cancelled=None,
+):
+    """Stream CSV file into a :class:`ColumnStore`, temporary by default."""
+    temporary = directory is None
+    if temporary:
+        directory = tempfile.mkdtemp(prefix="chronnotate-")
+    else:
+        os.makedirs(directory, exist_ok=True)
+    try:
+        _ingest_csv(
+            path,
+            skip_lines,
+            label_column,
+            compact,
+            directory,
+            chunk_bytes,
+            progress,
+            is_cancelled,
+            None,
+        )
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    return ColumnStore(directory, temporary=temporary)
+
+
+def _ingest_csv(
+    path,
+    skip_lines,
+    label_column,
+    compact,
+    directory,
+    chunk_bytes,
+    progress,
+    cancel,
+    source,
+):
+    sample = pd.read_csv(path, skiprows=skip_lines, nrows=CSV_SAMPLE_ROWS)
+    text_columns = [
+        col
+        for col in sample.columns
+        if col == label_column or not is_numeric_dtype(sample[col])
+    ]
+    row_bytes = sample.memory_usage(deep=True, index=False).sum() / max(
+        len(sample), 1
+    )
+    chunk_rows = max(1, int(chunk_bytes // max(row_bytes, 1)))
+    writers = [
+        _ColumnWriter(
+            directory,
+            i,
+            col,
+            "text" if col in text_columns else "numeric",
+            CODES_DTYPE if col in text_columns else sample[col].dtype,
+            compact,
+        )
+        for i, col in enumerate(sample.columns)
+    ]
+    total_bytes = max(os.path.getsize(path), 1)
+    try:
+        with (
+            open(path, "rb") as f,
+            pd.read_csv(
+                f,
+                skiprows=skip_lines,
+                chunksize=chunk_rows,
+                dtype={col: str for col in text_columns},
+                # the default parser may be off by one ulp, which keeps
+                # values written from float32 from being narrowed
+                float_precision="round_trip" if compact else None,
+            ) as reader,
+        ):
+            for chunk in reader:
+                if cancel is not None and cancel():
+                    raise OperationCancelled()
+                for writer in writers:
+                    writer.append(chunk[writer.name])
+                if progress is not None:
+                    progress(min(f.tell() / total_bytes, 1.0))
+        for writer in writers:
+            writer.finish()
+    finally:
+        for writer in writers:
+            writer.close()
+    meta = {
+        "rows": writers[0].rows if len(writers) > 0 else 0,
+        "columns": [writer.meta() for writer in writers],
+        "source": source,
+    }
+    with open(os.path.join(directory, META_FILE), "w") as f:
+        json.dump(meta, f)
+
+
+def file_fingerprint(path):
+    """Describe file by its size, modification time and partial hash."""
+    stat = os.stat(path)
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if stat.st_size > FINGERPRINT_BYTES:
+            f.seek(max(stat.st_size - FINGERPRINT_BYTES, FINGERPRINT_BYTES))
+            digest.update(f.read(FINGERPRINT_BYTES))
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": digest.hexdigest(),
+    }
+
+
+def open_cached_csv(
+    path,
+    skip_lines=0,
+    label_column=None,
+    compact=False,
+    cache_dir=CACHE_DIR,
+    chunk_bytes=CHUNK_BUDGET_BYTES,
+    progress=None,
+    is_cancelled=None,
+):
+    """Open CSV file through a :class:`ColumnStore` kept in the cache."""
+    key = hashlib.sha1(
+        repr(
+            (os.path.abspath(path), skip_lines, label_column, compact)
+        ).encode()
+    ).hexdigest()
+    directory = os.path.join(cache_dir, key)
+    source = dict(path=os.path.abspath(path), **file_fingerprint(path))
+    store = _open_cached_store(directory, source)
+    if store is not None:
+        return store
+    tmp_directory = f"{directory}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.makedirs(tmp_directory)
+        _ingest_csv(
+            path,
+            skip_lines,
+            label_column,
+            compact,
+            tmp_directory,
+            chunk_bytes,
+            progress,
+            is_cancelled,
+            source,
+        )
+    except OSError:
+        # the cache cannot be written, e.g. the disk is full or read-only
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        return ingest_csv(
+            path,
+            skip_lines,
+            label_column,
+            compact,
+            chunk_bytes=chunk_bytes,
+            progress=progress,
+            is_cancelled=is_cancelled,
+        )
+    except BaseException:
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        raise
+    try:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_directory, directory)
+    except OSError:
+        # another instance stored the same file in the meantime
+        store = _open_cached_store(directory, source)
+        if store is None:
+            return ColumnStore(tmp_directory, temporary=True)
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        return store
+    prune_cache(cache_dir, keep=key)
+    return ColumnStore(directory)
+
+
+def _open_cached_store(directory, source):
+    meta_path = os.path.join(directory, META_FILE)
+    try:
+        store = ColumnStore(directory)
+    except (OSError, ValueError, KeyError):
+        return None
+    if store.source != source:
+        store.close()
+        return None
+    # mark the store as recently used for pruning
+    try:
+        os.utime(meta_path)
+    except OSError:
+        pass
+    return store
+
+
+def prune_cache(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, keep=None):
+    """Remove least recently used stores until cache fits in ``max_bytes``."""
+    entries = []
+    for entry in os.scandir(cache_dir):
+        meta_path = os.path.join(entry.path, META_FILE)
+        if not entry.is_dir() or not os.path.exists(meta_path):
+            continue
+        size = sum(f.stat().st_size for f in os.scandir(entry.path))
+        entries.append((os.path.getmtime(meta_path), size, entry))
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        if entry.name != keep:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            total -= size
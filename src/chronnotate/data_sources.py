@@ -0,0 +1,317 @@
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from .column_store import ingest_csv, open_cached_csv
+from .data_utils import atomic_write, downcast, label_codes
+from .settings import (
+    CACHE_DIR,
+    CHUNK_BUDGET_BYTES,
+    COLUMN_CACHE_BYTES,
+    CSV_CHUNK_ROWS,
+    CSV_SAMPLE_ROWS,
+)
+from .workers import OperationCancelled
+
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError as e:
+        raise ImportError(
+            "Reading Parquet and Arrow files requires pyarrow, "
+            "install it with: pip install chronnotate[arrow]"
+        ) from e
+    return pa, ds
+
+
+def is_columnar_file(path):
+    return path.lower().endswith(PARQUET_EXTENSIONS + ARROW_EXTENSIONS)
+
+
+def to_categorical(values):
+    """Encode values as categorical of strings, in order of appearance."""
+    codes, uniques = pd.factorize(values)
+    return pd.Categorical.from_codes(
+        codes, categories=[str(value) for value in uniques]
+    )
+
+
+class ColumnCache:
+    """Least recently used cache of column values with a memory cap."""
+
+    def __init__(self, max_bytes=COLUMN_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._values = OrderedDict()
+
+    def __contains__(self, col):
+        return col in self._values
+
+    def get(self, col):
+        self._values.move_to_end(col)
+        return self._values[col]
+
+    def put(self, col, values):
+        if col in self._values:
+            self.nbytes -= self._values.pop(col).nbytes
+        self._values[col] = values
+        self.nbytes += values.nbytes
+        # the column being inserted is kept even if it exceeds the cap
+        while self.nbytes > self.max_bytes and len(self._values) > 1:
+            _, evicted = self._values.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        self._values.clear()
+        self.nbytes = 0
+
+
+class LazySource:
+    """Base for files whose columns are read on first access."""
+
+    def __init__(self, path, compact=False):
+        self.path = path
+        self.compact = compact
+        self.rows = None
+        self._cache = ColumnCache()
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, col):
+        if col not in self._cache:
+            self.cache_column(col, self.read_column(col))
+        return self._cache.get(col)
+
+    def is_loaded(self, col):
+        return col in self._cache
+
+    def cache_column(self, col, values):
+        self.rows = len(values)
+        self._cache.put(col, values)
+
+    def _combine(self, col, parts):
+        if len(parts) > 0:
+            values = pd.concat(parts, ignore_index=True)
+        else:
+            values = pd.Series([], dtype=object)
+        if not self.is_numeric(col):
+            return to_categorical(values)
+        values = values.to_numpy()
+        return downcast(values) if self.compact else values
+
+    def to_frame(self):
+        return pd.DataFrame(
+            {
+                col: (
+                    self._cache.get(col)
+                    if col in self._cache
+                    else self.read_column(col)
+                )
+                for col in self.columns
+            },
+            copy=False,
+        )
+
+    def close(self):
+        self._cache.clear()
+
+
+class ArrowSource(LazySource):
+    """Parquet or Arrow IPC (Feather) file read column by column."""
+
+    def __init__(self, path, label_column=None, compact=False):
+        super().__init__(path, compact)
+        pa, ds = _import_pyarrow()
+        file_format = (
+            "parquet" if path.lower().endswith(PARQUET_EXTENSIONS) else "ipc"
+        )
+        self._dataset = ds.dataset(path, format=file_format)
+        self.rows = self._dataset.count_rows()
+        self.columns = list(self._dataset.schema.names)
+        self._numeric = {
+            field.name: field.name != label_column
+            and (
+                pa.types.is_integer(field.type)
+                or pa.types.is_floating(field.type)
+                or pa.types.is_boolean(field.type)
+            )
+            for field in self._dataset.schema
+        }
+
+    def read_column(self, col, progress=None, is_cancelled=None):
+        batches = []
+        rows = 0
+        for batch in self._dataset.to_batches(columns=[col]):
+            if is_cancelled is not None and is_cancelled():
+                raise OperationCancelled()
+            batches.append(batch.column(0).to_pandas())
+            rows += batch.num_rows
+            if progress is not None:
+                progress(rows / max(self.rows, 1))
+        return self._combine(col, batches)
+
+    def iter_frames(self, rows):
+        """Iterate over the table in frames of at most ``rows`` rows."""
+        for batch in self._dataset.to_batches(batch_size=rows):
+            yield batch.to_pandas()
+
+    def is_numeric(self, col):
+        return self._numeric[col]
+
+
+class LazyCsvSource(LazySource):
+    """CSV file read column by column."""
+
+    def __init__(self, path, skip_lines=0, label_column=None, compact=False):
+        super().__init__(path, compact)
+        self.skip_lines = skip_lines
+        sample = pd.read_csv(path, skiprows=skip_lines, nrows=CSV_SAMPLE_ROWS)
+        self.columns = list(sample.columns)
+        self._numeric = {
+            col: col != label_column and is_numeric_dtype(sample[col])
+            for col in self.columns
+        }
+
+    def __len__(self):
+        if self.rows is None:
+            self.rows = self._count_rows()
+        return self.rows
+
+    def _count_rows(self):
+        # rows are counted by the parser, as quoted values and blank lines
+        # make the number of lines differ from the number of rows
+        rows = 0
+        with pd.read_csv(
+            self.path,
+            skiprows=self.skip_lines,
+            usecols=[0],
+            dtype=str,
+            chunksize=CSV_CHUNK_ROWS,
+        ) as reader:
+            for chunk in reader:
+                rows += len(chunk)
+        return rows
+
+    def read_column(self, col, progress=None, is_cancelled=None):
+        total_bytes = max(os.path.getsize(self.path), 1)
+        chunks = []
+        with (
+            open(self.path, "rb") as f,
+            pd.read_csv(
+                f,
+                skiprows=self.skip_lines,
+                usecols=[col],
+                dtype=None if self.is_numeric(col) else str,
+                chunksize=CSV_CHUNK_ROWS,
+                float_precision="round_trip" if self.compact else None,
+            ) as reader,
+        ):
+            for chunk in reader:
+                if is_cancelled is not None and is_cancelled():
+                    raise OperationCancelled()
+                chunks.append(chunk[col])
+                if progress is not None:
+                    progress(min(f.tell() / total_bytes, 1.0))
+        return self._combine(col, chunks)
+
+    def iter_frames(self, rows):
+        """Iterate over the table in frames of ``rows`` rows."""
+        text_columns = [
+            col for col in self.columns if not self.is_numeric(col)
+        ]
+        with pd.read_csv(
+            self.path,
+            skiprows=self.skip_lines,
+            dtype={col: str for col in text_columns},
+            chunksize=rows,
+        ) as reader:
+            yield from reader
+
+    def is_numeric(self, col):
+        return self._numeric[col]
+
+
+def open_data_source(
+    path,
+    skip_lines=0,
+    label_column=None,
+    lazy=False,
+    compact=False,
+    progress=None,
+    is_cancelled=None,
+):
+    """Open file with time-series data, choosing reader by its extension."""
+    if is_columnar_file(path) or lazy:
+        if is_columnar_file(path):
+            source = ArrowSource(path, label_column, compact)
+        else:
+            source = LazyCsvSource(path, skip_lines, label_column, compact)
+        # the label column is needed for annotations right away
+        if label_column in source.columns:
+            source.cache_column(
+                label_column,
+                source.read_column(label_column, progress, is_cancelled),
+            )
+        return source
+    if CACHE_DIR:
+        return open_cached_csv(
+            path,
+            skip_lines,
+            label_column,
+            compact,
+            progress=progress,
+            is_cancelled=is_cancelled,
+        )
+    return ingest_csv(
+        path,
+        skip_lines,
+        label_column,
+        compact,
+        progress=progress,
+        is_cancelled=is_cancelled,
+    )
+
+
+def save_labeled_csv(
+    path,
+    data,
+    label_column,
+    starts,
+    ends,
+    labels,
+    progress=None,
+    is_cancelled=None,
+):
+    """Write data with label column created from intervals to CSV file."""
+    codes, categories = pd.factorize(np.asarray(labels, dtype=object))
+    # formatted values take roughly tens of bytes each
+    rows = max(CHUNK_BUDGET_BYTES // (32 * (len(data.columns) + 1)), 1)
+    with atomic_write(path) as f:
+        offset = 0
+        header = True
+        for frame in data.iter_frames(rows):
+            if is_cancelled is not None and is_cancelled():
+                raise OperationCancelled()
+            frame[label_column] = pd.Categorical.from_codes(
+                label_codes(len(frame), starts, ends, codes, offset),
+                categories=categories,
+            )
+            frame.to_csv(f, index=False, header=header)
+            header = False
+            offset += len(frame)
+            if progress is not None:
+                progress(offset / max(len(data), 1))
+        if header:
+            columns = list(data.columns)
+            if label_column not in columns:
+                columns.append(label_column)
+            pd.DataFrame(columns=columns).to_csv(f, index=False)
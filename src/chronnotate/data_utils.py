@@ -1,22 +1,112 @@
+import os
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
 import pandas as pd
 
+from .settings import ANNOTATIONS_SUFFIX
 
-def find_subsegments(df, label_column):
-    if label_column not in df.columns:
-        raise ValueError(
-            f"Column '{label_column}' does not exist in the DataFrame"
-        )
 
-    labels = df[label_column]
-    changes = (labels != labels.shift()) | labels.isna()
+def find_subsegments(labels):
+    """Find starts, ends and codes of runs of equal non-missing labels."""
+    if isinstance(labels, pd.Categorical):
+        codes, categories = labels.codes, labels.categories
+    else:
+        codes, categories = pd.factorize(np.asarray(labels, dtype=object))
+    codes = np.asarray(codes)
+    categories = np.asarray(categories, dtype=object)
+    boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(codes)]))
+    if len(codes) == 0:
+        starts, ends = starts[:0], ends[:0]
+    run_codes = codes[starts]
+    labeled = run_codes >= 0
+    return starts[labeled], ends[labeled], run_codes[labeled], categories
+
+
+def compact_dtype(values):
+    """Find the smallest dtype that holds all values without loss."""
+    values = np.asarray(values)
+    if values.dtype.kind in "iu":
+        if len(values) == 0:
+            return np.dtype(np.int8)
+        vmin, vmax = int(values.min()), int(values.max())
+        if vmin >= 0:
+            return np.min_scalar_type(vmax)
+        return np.min_scalar_type(min(vmin, -vmax - 1))
+    if values.dtype.kind == "f" and values.dtype.itemsize > 4:
+        with np.errstate(over="ignore"):
+            narrowed = values.astype(np.float32)
+        exact = (narrowed == values) | np.isnan(values)
+        return np.dtype(np.float32) if exact.all() else values.dtype
+    return values.dtype
+
+
+def downcast(values):
+    """Convert values to their compact dtype, see :func:`compact_dtype`."""
+    return values.astype(compact_dtype(values), copy=False)
+
 
-    segment_starts = df.index[changes]
-    segment_ends = list(segment_starts[1:]) + [df.index[-1] + 1]
+def label_codes(length, starts, ends, codes, offset=0):
+    """Assign label codes of intervals to rows from ``offset``, -1 if none."""
+    starts = np.clip(np.asarray(starts, dtype=np.int64) - offset, 0, length)
+    ends = np.clip(np.asarray(ends, dtype=np.int64) - offset, 0, length)
+    codes = np.asarray(codes, dtype=np.int64)
+    nonempty = starts < ends
+    starts, ends, codes = starts[nonempty], ends[nonempty], codes[nonempty]
+    order = np.argsort(starts, kind="stable")
+    # non-overlapping intervals, the usual case, are assigned at once
+    if np.all(ends[order][:-1] <= starts[order][1:]):
+        changes = np.zeros(length + 1, dtype=np.int64)
+        np.add.at(changes, starts, codes + 1)
+        np.add.at(changes, ends, -(codes + 1))
+        return (np.cumsum(changes[:-1]) - 1).astype(np.int32)
+    # later intervals take precedence where intervals overlap
+    result = np.full(length, -1, dtype=np.int32)
+    for start, end, code in zip(starts, ends, codes):
+        result[start:end] = code
+    return result
+
+
+def annotations_path(path):
+    """Get path of the annotations file kept next to a data file."""
+    return os.path.splitext(path)[0] + ANNOTATIONS_SUFFIX
+
+
+@contextmanager
+def atomic_write(path):
+    """Open text file replacing ``path`` only when the block succeeds."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "w", newline="") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_annotations(path, starts, ends, labels):
+    """Write annotation intervals to CSV file with start, end and label."""
+    with atomic_write(path) as f:
+        pd.DataFrame({"start": starts, "end": ends, "label": labels}).to_csv(
+            f, index=False
+        )
 
-    subsegments = [
-        {"start": start, "end": end, "label": df.at[start, label_column]}
-        for start, end in zip(segment_starts, segment_ends)
-        if not pd.isna(df.at[start, label_column])  # Exclude NaN segments
-    ]
 
-    return subsegments
+def read_annotations(path):
+    """Read annotation intervals written by :func:`write_annotations`."""
+    annotations = pd.read_csv(
+        path,
+        dtype={"start": np.int64, "end": np.int64, "label": str},
+        keep_default_na=False,
+        na_filter=False,
+    )
+    return (
+        annotations["start"].to_numpy(),
+        annotations["end"].to_numpy(),
+        annotations["label"].to_numpy(dtype=object),
+    )
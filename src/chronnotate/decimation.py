@@ -0,0 +1,81 @@
+import numpy as np
+
+from .settings import CHUNK_BUDGET_BYTES, LOD_BASE_BIN, LOD_LEVEL_FACTOR
+
+
+def _reduce_bins(values, bin_size):
+    """Compute minimum and maximum of consecutive bins, ignoring NaNs."""
+    full = len(values) // bin_size * bin_size
+    bins = values[:full].reshape(-1, bin_size)
+    mins = np.fmin.reduce(bins, axis=1)
+    maxs = np.fmax.reduce(bins, axis=1)
+    if full < len(values):
+        tail = values[full:]
+        mins = np.append(mins, np.fmin.reduce(tail)).astype(values.dtype)
+        maxs = np.append(maxs, np.fmax.reduce(tail)).astype(values.dtype)
+    return mins, maxs
+
+
+class MinMaxPyramid:
+    """Levels of per-bin minimums and maximums of a series."""
+
+    def __init__(self, values, base=LOD_BASE_BIN, factor=LOD_LEVEL_FACTOR):
+        if values.dtype == bool:
+            values = values.view(np.uint8)
+        self.values = values
+        self.base = base
+        self.factor = factor
+        self.levels = []
+        if len(values) == 0:
+            self.bounds = (0, 0)
+            return
+        # memory-mapped values are reduced in chunks of whole bins
+        step = max(CHUNK_BUDGET_BYTES // values.itemsize // base, 1) * base
+        parts = [
+            _reduce_bins(np.asarray(values[start : start + step]), base)
+            for start in range(0, len(values), step)
+        ]
+        mins = np.concatenate([part[0] for part in parts])
+        maxs = np.concatenate([part[1] for part in parts])
+        # level 0 holds extremes of bins of base samples, each next level
+        # merges factor bins of the previous one
+        self.levels.append((mins, maxs))
+        while len(mins) > 1:
+            mins = _reduce_bins(mins, factor)[0]
+            maxs = _reduce_bins(maxs, factor)[1]
+            self.levels.append((mins, maxs))
+        vmin, vmax = mins[0], maxs[0]
+        self.bounds = (0, 0) if np.isnan(vmin) else (vmin, vmax)
+
+    def __len__(self):
+        return len(self.values)
+
+    def bin_size(self, level):
+        return self.base * self.factor**level
+
+    def decimate(self, x_start, x_end, pixels):
+        """Get points to draw for samples in range at given pixel width."""
+        n = len(self.values)
+        start = int(np.clip(np.floor(x_start), 0, n))
+        end = int(np.clip(np.ceil(x_end) + 1, start, n))
+        samples_per_pixel = (end - start) / max(pixels, 1)
+        if samples_per_pixel < self.base or len(self.levels) == 0:
+            return np.arange(start, end), self.values[start:end]
+        # coarsest level that still has at least one bin per pixel
+        level = 0
+        while (
+            level + 1 < len(self.levels)
+            and self.bin_size(level + 1) <= samples_per_pixel
+        ):
+            level += 1
+        bin_size = self.bin_size(level)
+        mins, maxs = self.levels[level]
+        first = start // bin_size
+        last = min(-(-end // bin_size), len(mins))
+        y = np.empty(2 * (last - first), dtype=mins.dtype)
+        y[0::2] = mins[first:last]
+        y[1::2] = maxs[first:last]
+        x = np.empty(len(y))
+        x[0::2] = np.arange(first, last) * bin_size
+        x[1::2] = x[0::2] + bin_size / 2
+        return x, y
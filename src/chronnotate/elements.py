@@ -1,17 +1,41 @@
 import string
+import time
 
+import numpy as np
 import pyqtgraph as pg
 from PyQt6.QtCore import (
     QAbstractListModel,
+    QEvent,
     QModelIndex,
+    QObject,
+    QPointF,
+    QRectF,
     Qt,
+    QTimer,
     QVariant,
     pyqtSignal,
 )
-from PyQt6.QtGui import QColor
+from PyQt6.QtGui import QColor, QPainter, QPicture
+from PyQt6.QtWidgets import QLabel
 
-from .settings import LABEL_SEPARATOR
-from .utils import SignalBlocker
+from . import instrumentation
+from .annotations import (
+    Annotation,
+    AnnotationIndex,
+    LabelIndex,
+    label_ids,
+    label_mask,
+)
+from .settings import (
+    DRAG_LOD_FACTOR,
+    FRAME_STATS_INTERVAL_MS,
+    LABEL_SEPARATOR,
+    REGION_HOVER_DISTANCE,
+    REGION_ITEMS_MARGIN,
+    REGION_ITEMS_MAX,
+    REGION_RENDERING,
+)
+from .utils import FrameThrottle, SignalBlocker
 
 
 class ColorItemElement:
@@ -180,6 +204,7 @@ class ColorItemElement:
 
         self.label = label
         self.prev_label = None
+        self.label_id = None
         if color is None:
             self.color = ColorItemElement.__COLORS[ColorItemElement.__i_COLORS]
             ColorItemElement.__i_COLORS = (
@@ -197,10 +222,52 @@ class ColorItemElement:
         return f"(label {self.label}, color {self.color})"
 
 
+def mix_colors(colors):
+    """Get color of annotation with labels of given colors."""
+    if len(colors) == 1:
+        return QColor(colors[0])
+    color = QColor()
+    for label_color in colors:
+        color.setRed(color.red() // 2 + label_color.red() // 2)
+        color.setGreen(color.green() // 2 + label_color.green() // 2)
+        color.setBlue(color.blue() // 2 + label_color.blue() // 2)
+    return color
+
+
 class ColorItemModel(QAbstractListModel):
+    """List of items with label, color and smallest unused ``label_id``."""
+
     def __init__(self, items, parent=None):
         super().__init__(parent)
         self.items = items
+        self._items_by_id = {}
+        for item in self.items:
+            self._assign_id(item)
+
+    def _assign_id(self, item):
+        label_id = 0
+        while label_id in self._items_by_id:
+            label_id += 1
+        item.label_id = label_id
+        self._items_by_id[label_id] = item
+
+    def find(self, label):
+        """Get first item with given label, or ``None``."""
+        for item in self.items:
+            if item.label == label:
+                return item
+        return None
+
+    def label_text(self, mask):
+        """Get labels set in bitmask as text, sorted by label."""
+        # sorted, as ids are reused and their order would change saved files
+        return LABEL_SEPARATOR.join(
+            sorted(
+                self._items_by_id[label_id].label
+                for label_id in label_ids(mask)
+                if label_id in self._items_by_id
+            )
+        )
 
     def rowCount(self, parent=QModelIndex()):
         return len(self.items)
@@ -242,6 +309,7 @@ class ColorItemModel(QAbstractListModel):
 
     def insertItem(self, item):
         self.beginInsertRows(QModelIndex(), self.rowCount(), self.rowCount())
+        self._assign_id(item)
         self.items.append(item)
         self.endInsertRows()
 
@@ -249,6 +317,7 @@ class ColorItemModel(QAbstractListModel):
         if not (0 <= index < len(self.items)):
             return False
         self.beginInsertRows(QModelIndex(), index, index)
+        self._assign_id(item)
         self.items.insert(index, item)
         self.endInsertRows()
         return True
@@ -257,6 +326,7 @@ class ColorItemModel(QAbstractListModel):
         if not (0 <= index < len(self.items)):
             return False
         self.beginRemoveRows(QModelIndex(), index, index)
+        del self._items_by_id[self.items[index].label_id]
         del self.items[index]
         self.endRemoveRows()
 
@@ -267,6 +337,34 @@ class ColorItemModel(QAbstractListModel):
         return flags
 
 
+class RegionStyle:
+    """Colors, pens and brushes shared by annotations of one color."""
+
+    _styles = {}
+
+    def __init__(self, color):
+        self.base_color = QColor(color)
+        self.hover_color = color.darker(75)
+        self.text_color = color.darker(150)
+        self.base_color.setAlpha(75)
+        self.hover_color.setAlpha(150)
+        self.text_color.setAlpha(255)
+        self.brush = pg.mkBrush(self.base_color)
+        self.hover_brush = pg.mkBrush(self.hover_color)
+        self.line_pen = pg.mkPen(color=self.hover_color, width=2)
+        self.hover_pen = pg.mkPen(color=self.text_color, width=2)
+        self.text_pen = pg.mkPen(self.text_color)
+        self.selected_text_pen = pg.mkPen(QColor("white"))
+        self.selected_fill = pg.mkBrush(self.hover_color)
+
+    @classmethod
+    def of(cls, color):
+        style = cls._styles.get(color.rgba())
+        if style is None:
+            style = cls._styles[color.rgba()] = cls(color)
+        return style
+
+
 class AnnotationRegion(pg.LinearRegionItem):
     regionChangeFinished = pyqtSignal(object)
     gotSelected = pyqtSignal(object)
@@ -287,77 +385,70 @@ class AnnotationRegion(pg.LinearRegionItem):
         self.label = label
         self.old_onset = values[0]
         self.selected = False
+        self.annotation = None
+        self._drag_update = FrameThrottle(self.move_to)
+        self._drag_action = None
 
-        self.base_color = color
-        self.hover_color = color.darker(75)
-        self.text_color = color.darker(150)
-        self.base_color.setAlpha(75)
-        self.hover_color.setAlpha(150)
-        self.text_color.setAlpha(255)
-
-        self.label_item = pg.TextItem(text=label, anchor=(0.5, 0.5))
-        self.sigRegionChanged.connect(self.update_label_pos)
-
-        self.update_color()
-        self.update_label_pos()
+        self.set_color(color)
         self.plot_widget.addItem(self, ignoreBounds=True)
-        self.plot_widget.addItem(self.label_item, ignoreBounds=True)
 
-    def setRegion(self, region):
-        pg.LinearRegionItem.setRegion(self, region)
-        self.update_label_pos()
+    def reset(self, label, color, values):
+        """Reuse the region for another annotation and add it to the plot."""
+        self.setZValue(0)
+        self.old_onset = values[0]
+        self.setMouseHover(False)
+        for line in self.lines:
+            line.setMouseHover(False)
+        self.update_label(label)
+        self.set_color(color)
+        with SignalBlocker(self):
+            self.setRegion(values)
+        self.select(False)
+        self.plot_widget.addItem(self, ignoreBounds=True)
 
     def region_changed(self):
         self.regionChangeFinished.emit(self)
-        self.update_label_pos()
+
+    def set_color(self, color):
+        self.style = RegionStyle.of(color)
+        self.base_color = self.style.base_color
+        self.hover_color = self.style.hover_color
+        self.text_color = self.style.text_color
+        self.update_color()
 
     def update_color(self):
-        kwargs = dict(color=self.hover_color, width=2)
-        self.line_pen = pg.mkPen(**kwargs)
-        self.hover_pen = pg.mkPen(color=self.text_color, width=2)
-        self.setBrush(self.base_color)
-        self.setHoverBrush(self.hover_color)
-        self.label_item.setColor(self.text_color)
+        self.line_pen = self.style.line_pen
+        self.hover_pen = self.style.hover_pen
+        # the shared objects are assigned directly, as the setters of
+        # pyqtgraph items copy them
+        self.brush = self.style.brush
+        self.hoverBrush = self.style.hover_brush
+        self.currentBrush = (
+            self.hoverBrush if self.mouseHovering else self.brush
+        )
         for line in self.lines:
-            line.setPen(self.line_pen)
-            line.setHoverPen(self.hover_pen)
+            line.pen = self.line_pen
+            line.hoverPen = self.hover_pen
+            line.currentPen = line.hoverPen if line.mouseHovering else line.pen
+            line.update()
         self.update()
 
     def update_label(self, label):
         self.label = label
-        self.label_item.setText(label)
-        self.label_item.update()
-
-    def update_label_pos(self):
-        rgn = self.getRegion()
-        vb = self.plot_widget.plotItem.vb
-        if vb:
-            yvb = vb.viewRange()[1]
-            self.label_item.setPos(sum(rgn) / 2, sum(yvb) / 2)
 
     def update_visible(self, visible):
         self.setVisible(visible)
-        self.label_item.setVisible(visible)
 
     def update_bounds(self, bounds):
         self.setBounds(bounds)
 
     def remove(self):
         self.removeRequested.emit(self)
-        vb = self.plot_widget.plotItem.vb
-        if vb and self.label_item in vb.addedItems:
-            vb.removeItem(self.label_item)
 
     def select(self, selected):
         self.selected = selected
         if selected:
-            self.label_item.setColor("w")
-            self.label_item.fill = pg.mkBrush(self.hover_color)
             self.gotSelected.emit(self)
-        else:
-            self.label_item.setColor(self.text_color)
-            self.label_item.fill = pg.mkBrush(None)
-        self.label_item.update()
 
     def mouseClickEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton and self.movable:
@@ -379,11 +470,27 @@ class AnnotationRegion(pg.LinearRegionItem):
             self.cursorOffsets = [line.pos() - bdp for line in self.lines]
             self.startPositions = [line.pos() for line in self.lines]
             self.moving = True
+            self._drag_action = instrumentation.start(
+                "region_drag", mode="move"
+            )
+            self.plot_widget.set_dragging(True)
 
         if not self.moving:
             return
 
-        new_pos = [pos + event.pos() for pos in self.cursorOffsets]
+        if event.isFinish():
+            self._drag_update.cancel()
+            self.move_to(QPointF(event.pos()))
+            self.moving = False
+            self.plot_widget.set_dragging(False)
+            self.sigRegionChangeFinished.emit(self)
+            instrumentation.finish(self._drag_action)
+        else:
+            self._drag_update(QPointF(event.pos()))
+
+    def move_to(self, cursor_pos):
+        """Move region with the cursor, keeping it within bounds."""
+        new_pos = [pos + cursor_pos for pos in self.cursorOffsets]
         idx = 0 if new_pos[0].x() <= new_pos[1].x() else 1
         if new_pos[idx].x() < self.lines[idx].bounds()[0]:
             shift = self.lines[idx].bounds()[0] - new_pos[idx].x()
@@ -401,12 +508,428 @@ class AnnotationRegion(pg.LinearRegionItem):
             for pos, line in zip(new_pos, self.lines):
                 line.setPos(pos)
         self.prepareGeometryChange()
+        self.sigRegionChanged.emit(self)
 
-        if event.isFinish():
-            self.moving = False
-            self.sigRegionChangeFinished.emit(self)
+
+class ViewSpanningItem(pg.GraphicsObject):
+    """Item whose bounds always cover the whole view of its view box."""
+
+    def __init__(self):
+        super().__init__()
+        self._bounding_rect = None
+
+    def viewTransformChanged(self):
+        self.prepareGeometryChange()
+        self._bounding_rect = None
+        super().viewTransformChanged()
+
+    def boundingRect(self):
+        if self._bounding_rect is None:
+            view_rect = self.viewRect()
+            self._bounding_rect = (
+                QRectF() if view_rect is None else QRectF(view_rect)
+            )
+        return self._bounding_rect
+
+
+class RegionLayer(ViewSpanningItem):
+    """Item drawing all annotations of a plot, promoting a few to regions."""
+
+    def __init__(
+        self,
+        plot_widget,
+        mode=REGION_RENDERING,
+        max_items=REGION_ITEMS_MAX,
+        margin=REGION_ITEMS_MARGIN,
+    ):
+        super().__init__()
+        self.plot_widget = plot_widget
+        self.mode = mode
+        self.max_items = max_items
+        self.margin = margin
+        self.annotations = AnnotationIndex()
+        self.label_index = LabelIndex()
+        self.hovered = None
+        self.selected = None
+        self.bounds = (0, 1e9)
+        self._promoted = {}
+        self._pool = []
+        self._window = None
+        self._picture = None
+        self._picture_key = None
+        self.setZValue(0)
+        self.plot_widget.addItem(self, ignoreBounds=True)
+        self.label_overlay = RegionLabelOverlay(self)
+
+    def add(self, annotations):
+        if len(annotations) == 1:
+            self.annotations.add(annotations[0])
+        else:
+            self.annotations.extend(annotations)
+        for annotation in annotations:
+            self.label_index.add(annotation)
+        self.invalidate()
+
+    def create(self, labels, color, values):
+        """Add annotation and promote it for editing, as the selected one."""
+        annotation = Annotation(*values, labels, color)
+        self.add([annotation])
+        self.promote(annotation)
+        annotation.region.update_visible(True)
+        self.set_selected(annotation)
+        return annotation
+
+    def remove(self, annotations):
+        for annotation in annotations:
+            if annotation is self.hovered:
+                self.hovered = None
+            if annotation is self.selected:
+                self.selected = None
+            self.demote(annotation)
+            self.label_index.remove(annotation)
+        self.annotations.remove_all(annotations)
+        self.invalidate()
+
+    def label_text(self, annotation):
+        return self.plot_widget.lv_labels.model().label_text(annotation.labels)
+
+    def refresh(self):
+        self._picture = None
+        self.update()
+        self.label_overlay.update()
+
+    def refresh_labels(self):
+        """Show labels again after they were renamed."""
+        for annotation in self._promoted.values():
+            annotation.region.update_label(self.label_text(annotation))
+        self.label_overlay.update()
+
+    def update_bounds(self, bounds):
+        self.bounds = bounds
+        for annotation in (self.hovered, self.selected):
+            if annotation is not None and annotation.region is not None:
+                annotation.region.update_bounds(bounds)
+
+    def update_visible(self, visible):
+        self.setVisible(visible)
+        self.label_overlay.setVisible(visible)
+        for annotation in self._promoted.values():
+            annotation.region.update_visible(visible)
+        self.update_items(force=True)
+
+    def set_mode(self, mode):
+        self.mode = mode
+        self.update_items(force=True)
+
+    def invalidate(self):
+        self.update_items(force=True)
+        self.refresh()
+
+    def intervals(self):
+        return self.annotations.intervals()
+
+    def overlapping(self, x_start, x_end):
+        return self.annotations.overlapping(x_start, x_end)
+
+    def annotation_at(self, x):
+        """Get the last starting annotation within a few pixels of ``x``."""
+        distance = REGION_HOVER_DISTANCE * (self.pixelWidth() or 0)
+        candidates = self.overlapping(x - distance, x + distance)
+        containing = [a for a in candidates if a.start <= x <= a.end]
+        candidates = containing if len(containing) > 0 else candidates
+        return candidates[-1] if len(candidates) > 0 else None
+
+    def promote(self, annotation):
+        if annotation.region is not None:
+            return
+        values = (annotation.start, annotation.end)
+        if len(self._pool) > 0:
+            region = self._pool.pop()
+            region.reset(self.label_text(annotation), annotation.color, values)
+        else:
+            region = AnnotationRegion(
+                self.plot_widget,
+                self.label_text(annotation),
+                annotation.color,
+                values,
+            )
+            region.sigRegionChanged.connect(self.label_overlay.update)
+            region.regionChangeFinished.connect(self.region_moved)
+            region.removeRequested.connect(self.region_removed)
+            region.gotSelected.connect(self.region_selected)
+        region.annotation = annotation
+        region.update_bounds(self.bounds)
+        region.update_visible(self.isVisible())
+        annotation.region = region
+        self._promoted[id(annotation)] = annotation
+        self.refresh()
+
+    def demote(self, annotation):
+        region = annotation.region
+        if region is None:
+            return
+        self.plot_widget.removeItem(region)
+        region.annotation = None
+        annotation.region = None
+        del self._promoted[id(annotation)]
+        self._pool.append(region)
+        self.refresh()
+
+    def release(self, annotation):
+        """Demote annotation, unless it is kept promoted by the view."""
+        if annotation is self.hovered or annotation is self.selected:
+            return
+        if (
+            self.mode == "items"
+            and self._window is not None
+            and annotation.start <= self._window[1]
+            and annotation.end >= self._window[0]
+        ):
+            return
+        self.demote(annotation)
+
+    def update_items(self, force=False):
+        """Promote annotations within the view in the ``"items"`` mode."""
+        view_rect = None
+        if self.mode == "items" and self.isVisible():
+            view_rect = self.viewRect()
+        if view_rect is None:
+            self._window = None
+            wanted = []
         else:
-            self.sigRegionChanged.emit(self)
+            x_start, x_end = view_rect.left(), view_rect.right()
+            width = x_end - x_start
+            window = self._window
+            if (
+                not force
+                and window is not None
+                and window[0] <= x_start
+                and x_end <= window[1]
+                and 2 * (1 + 2 * self.margin) * width > window[1] - window[0]
+            ):
+                return
+            margin = self.margin * width
+            self._window = (x_start - margin, x_end + margin)
+            wanted = self.overlapping(*self._window)
+            if len(wanted) > self.max_items:
+                # too many items to be responsive, leave them to the layer
+                self._window = None
+                wanted = []
+        wanted_ids = set(map(id, wanted))
+        for annotation in list(self._promoted.values()):
+            if id(annotation) not in wanted_ids:
+                self.release(annotation)
+        for annotation in wanted:
+            self.promote(annotation)
+
+    def set_hovered(self, annotation):
+        previous, self.hovered = self.hovered, annotation
+        if annotation is previous:
+            return
+        if annotation is not None:
+            self.promote(annotation)
+        if previous is not None:
+            self.release(previous)
+
+    def set_selected(self, annotation):
+        previous, self.selected = self.selected, annotation
+        self.label_overlay.update()
+        if annotation is previous or previous is None:
+            return
+        if previous.region is not None:
+            previous.region.select(False)
+        self.release(previous)
+
+    def region_moved(self, region):
+        self.annotations.move(region.annotation, *region.getRegion())
+        self.invalidate()
+
+    def region_removed(self, region):
+        self.remove([region.annotation])
+
+    def region_selected(self, region):
+        self.set_selected(region.annotation)
+
+    def hoverEvent(self, event):
+        if event.isExit():
+            self.set_hovered(None)
+        else:
+            self.set_hovered(self.annotation_at(event.pos().x()))
+
+    def viewTransformChanged(self):
+        super().viewTransformChanged()
+        self.update_items()
+
+    def spans(self, x_start, x_end, pixel):
+        """Get spans of annotations in range by color, merged below a pixel."""
+        index = self.annotations
+        first, last = index.span(x_start, x_end)
+        starts, ends = index.intervals()
+        starts, ends = starts[first:last], ends[first:last]
+        colors = index.colors()[first:last]
+        drawn = ends >= x_start
+        for annotation in self._promoted.values():
+            i = index.position(annotation) - first
+            if 0 <= i < len(drawn):
+                drawn[i] = False
+        starts, colors = starts[drawn], colors[drawn]
+        ends = np.maximum(ends[drawn], starts + pixel)
+        spans = {}
+        for color in np.unique(colors):
+            same = colors == color
+            color_starts, color_ends = starts[same], ends[same]
+            reach = np.maximum.accumulate(color_ends)
+            firsts = np.concatenate(
+                (
+                    [0],
+                    np.flatnonzero(color_starts[1:] > reach[:-1] + pixel) + 1,
+                )
+            )
+            spans[int(color)] = (
+                color_starts[firsts],
+                np.maximum.reduceat(color_ends, firsts),
+            )
+        return spans
+
+    def picture(self, x_start, x_end, pixel):
+        """Get picture of annotations in range, spanning y from 0 to 1."""
+        key = (x_start, x_end, pixel)
+        if self._picture is not None and self._picture_key == key:
+            return self._picture
+        picture = QPicture()
+        painter = QPainter(picture)
+        painter.setPen(Qt.PenStyle.NoPen)
+        for color, (starts, ends) in self.spans(*key).items():
+            painter.setBrush(RegionStyle.of(QColor.fromRgba(color)).brush)
+            painter.drawRects(
+                [
+                    QRectF(start, 0, end - start, 1)
+                    for start, end in zip(starts.tolist(), ends.tolist())
+                ]
+            )
+        painter.end()
+        self._picture, self._picture_key = picture, key
+        return picture
+
+    def paint(self, painter, *args):
+        view_rect = self.viewRect()
+        if view_rect is None:
+            return
+        picture = self.picture(
+            view_rect.left(), view_rect.right(), self.pixelWidth() or 0
+        )
+        painter.translate(0, view_rect.top())
+        painter.scale(1, view_rect.height())
+        picture.play(painter)
+
+
+class RegionLabelOverlay(ViewSpanningItem):
+    """Item drawing labels of all annotations of a region layer at once."""
+
+    def __init__(self, layer):
+        super().__init__()
+        self.layer = layer
+        self.setZValue(10)
+        layer.plot_widget.addItem(self, ignoreBounds=True)
+
+    def labeled_annotations(self, x_start, x_end, min_length):
+        """Get annotations in range not shorter than ``min_length``."""
+        index = self.layer.annotations
+        first, last = index.span(x_start, x_end)
+        starts, ends = index.intervals()
+        starts, ends = starts[first:last], ends[first:last]
+        candidates = np.flatnonzero(
+            (ends - starts >= min_length) & (ends >= x_start)
+        )
+        labeled = [
+            (index[first + i].start, index[first + i].end, index[first + i])
+            for i in candidates
+            if index[first + i].region is None
+        ]
+        for annotation in self.layer._promoted.values():
+            labeled.append((*annotation.region.getRegion(), annotation))
+        return labeled
+
+    def paint(self, painter, *args):
+        view_rect = self.viewRect()
+        if view_rect is None:
+            return
+        transform = painter.transform()
+        scale = abs(transform.m11()) or 1
+        metrics = painter.fontMetrics()
+        model = self.layer.plot_widget.lv_labels.model()
+        min_width = min(
+            (metrics.horizontalAdvance(item.label) for item in model.items),
+            default=0,
+        )
+        texts = {}
+        labels = []
+        for start, end, annotation in self.labeled_annotations(
+            view_rect.left(), view_rect.right(), min_width / scale
+        ):
+            if annotation.labels not in texts:
+                text = model.label_text(annotation.labels)
+                texts[annotation.labels] = (
+                    text,
+                    metrics.horizontalAdvance(text),
+                )
+            text, width = texts[annotation.labels]
+            if (end - start) * scale >= width:
+                labels.append(((start + end) / 2, text, width, annotation))
+        # labels are drawn in device coordinates, so they are not scaled
+        y = view_rect.center().y()
+        painter.resetTransform()
+        for x, text, width, annotation in labels:
+            position = transform.map(QPointF(x, y))
+            rect = QRectF(
+                position.x() - width / 2 - 2,
+                position.y() - metrics.height() / 2,
+                width + 4,
+                metrics.height(),
+            )
+            style = RegionStyle.of(annotation.color)
+            if annotation is self.layer.selected:
+                painter.fillRect(rect, style.selected_fill)
+                painter.setPen(style.selected_text_pen)
+            else:
+                painter.setPen(style.text_pen)
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, text)
+
+
+class DecimatedCurveItem(pg.PlotCurveItem):
+    """Curve drawing a :class:`MinMaxPyramid` at the resolution of the view."""
+
+    def __init__(self, pyramid, **kwargs):
+        super().__init__(connect="finite", **kwargs)
+        self.pyramid = pyramid
+        self.lod_factor = 1
+        self._lod_key = None
+
+    def set_lod_factor(self, factor):
+        """Draw ``factor`` times fewer points than the view has pixels."""
+        self.lod_factor = factor
+        self.update_lod()
+
+    def viewTransformChanged(self):
+        super().viewTransformChanged()
+        self.update_lod()
+
+    def update_lod(self):
+        vb = self.getViewBox()
+        if vb is None:
+            return
+        x_range = vb.viewRange()[0]
+        pixels = max(int(vb.width()) // self.lod_factor, 1)
+        key = (x_range[0], x_range[1], pixels)
+        if key == self._lod_key:
+            return
+        self._lod_key = key
+        self.setData(*self.pyramid.decimate(*x_range, pixels))
+
+    def dataBounds(self, ax, frac=1.0, orthoRange=None):
+        if ax == 0:
+            return (0, max(len(self.pyramid) - 1, 0))
+        return self.pyramid.bounds
 
 
 class ViewBox(pg.ViewBox):
@@ -414,6 +937,8 @@ class ViewBox(pg.ViewBox):
         super().__init__()
         self._drag_start = None
         self._drag_region = None
+        self._drag_update = FrameThrottle(self.update_drag_region)
+        self._drag_action = None
         self.plot_widget = None
 
     def set_plot_widget(self, widget):
@@ -426,36 +951,12 @@ class ViewBox(pg.ViewBox):
             if self.plot_widget.annotation_regions_requirements_satisfied():
                 if event.isStart():
                     lv_labels = self.plot_widget.lv_labels
-                    selected_indexes = lv_labels.selectedIndexes()
-                    model = lv_labels.model()
-                    label = LABEL_SEPARATOR.join(
-                        [
-                            model.data(index, Qt.ItemDataRole.DisplayRole)
-                            for index in selected_indexes
-                        ]
-                    )
-                    if len(selected_indexes) == 1:
-                        label_color = model.data(
-                            selected_indexes[0],
-                            Qt.ItemDataRole.DecorationRole,
-                        )
-                        color = QColor(label_color)
-                    else:
-                        color = QColor()
-                        for index in selected_indexes:
-                            label_color = model.data(
-                                index,
-                                Qt.ItemDataRole.DecorationRole,
-                            )
-                            color.setRed(
-                                color.red() // 2 + label_color.red() // 2
-                            )
-                            color.setGreen(
-                                color.green() // 2 + label_color.green() // 2
-                            )
-                            color.setBlue(
-                                color.blue() // 2 + label_color.blue() // 2
-                            )
+                    items = [
+                        lv_labels.model().items[index.row()]
+                        for index in lv_labels.selectedIndexes()
+                    ]
+                    labels = label_mask(item.label_id for item in items)
+                    color = mix_colors([item.color for item in items])
                     self._drag_start = self.mapSceneToView(
                         event.lastScenePos()
                     ).x()
@@ -463,59 +964,150 @@ class ViewBox(pg.ViewBox):
                         0 if self._drag_start < 0 else self._drag_start
                     )
                     drag_stop = self.mapSceneToView(event.scenePos()).x()
-                    self._drag_region = AnnotationRegion(
-                        plot_widget=self.plot_widget,
-                        label=label,
-                        color=color,
-                        values=(self._drag_start, drag_stop),
-                    )
-                    self._drag_region.removeRequested.connect(
-                        self.remove_region
-                    )
-                    self.sigYRangeChanged.connect(
-                        self._drag_region.update_label_pos
-                    )
-                    self.plot_widget.annotation_regions.append(
-                        self._drag_region
+                    self._drag_region = self.plot_widget.region_layer.create(
+                        labels, color, (self._drag_start, drag_stop)
+                    ).region
+                    self._drag_action = instrumentation.start(
+                        "region_drag", mode="create"
                     )
+                    self.plot_widget.set_dragging(True)
                 elif event.isFinish():
+                    self._drag_update.cancel()
+                    self.plot_widget.set_dragging(False)
                     drag_stop = self.mapSceneToView(event.scenePos()).x()
                     drag_stop = 0 if drag_stop < 0 else drag_stop
                     self._drag_region.setRegion((self._drag_start, drag_stop))
                     self._drag_region.select(True)
                     self._drag_region.setZValue(2)
+                    self._drag_region.region_changed()
+                    instrumentation.finish(self._drag_action)
                 else:
-                    x_to = self.mapSceneToView(event.scenePos()).x()
-                    with SignalBlocker(self._drag_region):
-                        self._drag_region.setRegion((self._drag_start, x_to))
+                    self._drag_update(QPointF(event.scenePos()))
         else:
             super().mouseDragEvent(event)
 
-    def remove_region(self, region: AnnotationRegion):
-        self.plot_widget.removeItem(region)
-        self.plot_widget.removeItem(region.label_item)
-        self.plot_widget.annotation_regions.remove(region)
+    def update_drag_region(self, scene_pos):
+        x_to = self.mapSceneToView(scene_pos).x()
+        with SignalBlocker(self._drag_region):
+            self._drag_region.setRegion((self._drag_start, x_to))
+        self.plot_widget.region_layer.label_overlay.update()
 
 
 class AnnotationPlotWidget(pg.PlotWidget):
     def __init__(self, parent=None):
         super().__init__(parent, viewBox=ViewBox())
         self.plotItem.vb.set_plot_widget(self)
-        self.annotation_regions = None
+        self.region_layer = None
         self.lv_labels = None
 
-    def set_annotation_regions_requirements(self, collection, lv_labels):
-        self.annotation_regions = collection
+    def set_annotation_regions_requirements(self, region_layer, lv_labels):
+        self.region_layer = region_layer
         self.lv_labels = lv_labels
 
     def annotation_regions_requirements_satisfied(self):
         return (
-            self.annotation_regions is not None
+            self.region_layer is not None
             and self.lv_labels is not None
             and len(self.lv_labels.selectedIndexes()) > 0
         )
 
+    def set_dragging(self, dragging):
+        """Draw curves with fewer points while a region is dragged."""
+        if DRAG_LOD_FACTOR <= 1:
+            return
+        for item in self.plotItem.items:
+            if isinstance(item, DecimatedCurveItem):
+                item.set_lod_factor(DRAG_LOD_FACTOR if dragging else 1)
+
     def update_annotation_regions_bounds(self, bounds):
-        if self.annotation_regions is not None:
-            for region in self.annotation_regions:
-                region.update_bounds(bounds)
+        if self.region_layer is not None:
+            self.region_layer.update_bounds(bounds)
+
+
+class FrameStatsOverlay(QObject):
+    """Label over a plot widget with statistics of drawing the plot."""
+
+    def __init__(self, plot_widget, region_layer=None, view_sync=None):
+        super().__init__(plot_widget)
+        self.plot_widget = plot_widget
+        self.region_layer = region_layer
+        self.view_sync = view_sync
+        self.frame_times = []
+        self.interval_start = time.perf_counter()
+        self.label = QLabel(plot_widget)
+        self.label.setStyleSheet(
+            "background-color: white; color: black; padding: 2px;"
+        )
+        self.label.setTextFormat(Qt.TextFormat.PlainText)
+        self.label.setAttribute(
+            Qt.WidgetAttribute.WA_TransparentForMouseEvents
+        )
+        self.label.move(4, 4)
+        self.label.hide()
+        self.timer = QTimer(self)
+        self.timer.setInterval(FRAME_STATS_INTERVAL_MS)
+        self.timer.timeout.connect(self.update_label)
+
+    def set_enabled(self, enabled):
+        viewport = self.plot_widget.viewport()
+        if enabled:
+            self.frame_times = []
+            self.interval_start = time.perf_counter()
+            viewport.installEventFilter(self)
+            self.timer.start()
+            self.update_label()
+            self.label.show()
+            self.label.raise_()
+        else:
+            viewport.removeEventFilter(self)
+            self.timer.stop()
+            self.label.hide()
+
+    def eventFilter(self, obj, event):
+        if event.type() != QEvent.Type.Paint:
+            return False
+        start = time.perf_counter()
+        self.plot_widget.viewportEvent(event)
+        self.frame_times.append(time.perf_counter() - start)
+        return True
+
+    def update_label(self):
+        now = time.perf_counter()
+        frame_times = np.array(self.frame_times) * 1000
+        fps = len(frame_times) / max(now - self.interval_start, 1e-9)
+        self.frame_times = []
+        self.interval_start = now
+        items = self.plot_widget.scene().items()
+        points = sum(
+            len(item.xData)
+            for item in self.plot_widget.plotItem.items
+            if isinstance(item, pg.PlotCurveItem)
+            and item.isVisible()
+            and item.xData is not None
+        )
+        lines = [
+            (
+                f"frame {frame_times.mean():.1f} ms, "
+                f"max {frame_times.max():.1f} ms, {fps:.0f} fps"
+                if len(frame_times) > 0
+                else "frame -, 0 fps"
+            ),
+            f"points {points:,}",
+            f"scene items {len(items):,}",
+        ]
+        if self.region_layer is not None:
+            regions = sum(isinstance(item, AnnotationRegion) for item in items)
+            lines.append(
+                f"annotations {len(self.region_layer.annotations):,}, "
+                f"regions {regions:,}"
+            )
+        if self.view_sync is not None:
+            counters = self.view_sync.counters
+            lines.append(
+                "range changes "
+                f"{counters['plot_changes'] + counters['region_changes']:,}, "
+                "updates "
+                f"{counters['plot_updates'] + counters['region_updates']:,}"
+            )
+        self.label.setText("\n".join(lines))
+        self.label.adjustSize()
@@ -1,5 +1,6 @@
 from PyQt6 import QtGui
 from PyQt6.QtWidgets import (
+    QCheckBox,
     QDialog,
     QGridLayout,
     QLabel,
@@ -10,7 +11,7 @@ from PyQt6.QtWidgets import (
 
 
 class OpenDialog(QDialog):
-    def __init__(self, default_label_column_name="Label"):
+    def __init__(self, default_label_column_name="Label", text_file=True):
         super().__init__()
 
         self.setWindowTitle("File settings")
@@ -29,6 +30,7 @@ class OpenDialog(QDialog):
 
         self.skip_lines_spinbox = QSpinBox()
         self.skip_lines_spinbox.setMinimum(0)  # Minimum value for the spinbox
+        self.skip_lines_spinbox.setEnabled(text_file)
         layout.addWidget(self.skip_lines_spinbox, 0, 1)
 
         label_column_name_label = QLabel("Label Column Name:")
@@ -37,9 +39,24 @@ class OpenDialog(QDialog):
         self.label_column_name_edit = QLineEdit(default_label_column_name)
         layout.addWidget(self.label_column_name_edit, 1, 1)
 
+        self.lazy_checkbox = QCheckBox("Load columns on demand")
+        self.lazy_checkbox.setToolTip(
+            "Read only the header when opening the file and read the values"
+            " of a column when it is first plotted, useful for wide files"
+        )
+        self.lazy_checkbox.setEnabled(text_file)
+        layout.addWidget(self.lazy_checkbox, 2, 0, 1, 2)
+
+        self.compact_checkbox = QCheckBox("Compact numeric types")
+        self.compact_checkbox.setToolTip(
+            "Store numeric columns with the smallest type that holds their"
+            " values without loss, e.g. float32 or int16"
+        )
+        layout.addWidget(self.compact_checkbox, 3, 0, 1, 2)
+
         self.ok_button = QPushButton("OK")
         self.ok_button.clicked.connect(self.accept)
-        layout.addWidget(self.ok_button, 2, 0, 1, 2)
+        layout.addWidget(self.ok_button, 4, 0, 1, 2)
 
         self.setLayout(layout)
 
@@ -48,3 +65,9 @@ class OpenDialog(QDialog):
 
     def get_label_column_name(self):
         return self.label_column_name_edit.text()
+
+    def get_lazy_loading(self):
+        return self.lazy_checkbox.isChecked()
+
+    def get_compact_types(self):
+        return self.compact_checkbox.isChecked()
@@ -0,0 +1,129 @@
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+_recorder = None
+
+
+class ActionRecorder:
+    """Timing records and profiles of user actions written to a directory."""
+
+    def __init__(self, directory, profiled=()):
+        self.directory = directory
+        self.profiled = set(profiled)
+        self.count = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(directory, exist_ok=True)
+
+    def is_profiled(self, name):
+        return name in self.profiled or "all" in self.profiled
+
+    def start(self, name, **info):
+        profile = None
+        if self.is_profiled(name) and not getattr(
+            self._local, "profiling", False
+        ):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # another profiler is active in the interpreter
+                profile = None
+            else:
+                self._local.profiling = True
+        return Action(self, name, info, profile)
+
+    def write(self, record, profile=None):
+        with self._lock:
+            self.count += 1
+            if profile is not None:
+                record["profile"] = f"{self.count:05d}-{record['action']}.prof"
+                profile.dump_stats(
+                    os.path.join(self.directory, record["profile"])
+                )
+            with open(os.path.join(self.directory, "actions.jsonl"), "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+
+class Action:
+    """User action being timed by an :class:`ActionRecorder`."""
+
+    __slots__ = ("recorder", "name", "info", "profile", "started", "clock")
+
+    def __init__(self, recorder, name, info, profile=None):
+        self.recorder = recorder
+        self.name = name
+        self.info = info
+        self.profile = profile
+        self.started = datetime.now()
+        self.clock = time.perf_counter()
+
+    def finish(self, **info):
+        seconds = time.perf_counter() - self.clock
+        if self.profile is not None:
+            self.profile.disable()
+            self.recorder._local.profiling = False
+        record = dict(
+            action=self.name,
+            started=self.started.isoformat(timespec="milliseconds"),
+            seconds=seconds,
+            thread=threading.current_thread().name,
+            **self.info,
+            **info,
+        )
+        self.recorder.write(record, self.profile)
+
+
+def enable(directory, profiled=()):
+    """Record user actions to a new session directory in ``directory``."""
+    global _recorder
+    session = datetime.now().strftime("session-%Y%m%d-%H%M%S")
+    _recorder = ActionRecorder(
+        os.path.join(directory, f"{session}-{os.getpid()}"), profiled
+    )
+    return _recorder
+
+
+def disable():
+    global _recorder
+    _recorder = None
+
+
+def is_enabled():
+    return _recorder is not None
+
+
+def start(name, **info):
+    """Start timing action, returning ``None`` when recording is disabled."""
+    if _recorder is None:
+        return None
+    return _recorder.start(name, **info)
+
+
+def finish(action, **info):
+    """Finish timing action returned by :func:`start`."""
+    if action is not None:
+        action.finish(**info)
+
+
+def timed(fn):
+    """Time calls of ``fn`` as actions named after it, when enabled."""
+
+    # signals passing arguments that fn does not take must be connected
+    # through a lambda
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _recorder is None:
+            return fn(*args, **kwargs)
+        action = _recorder.start(fn.__name__)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            action.finish()
+
+    return wrapper
@@ -1,6 +1,49 @@
+import os
+
 from PyQt6.QtGui import QColor
 
 LV_DATA_COLUMNS_COLOR_INACTIVE = QColor("transparent")
 LV_DATA_COLUMNS_COLOR_ACTIVE = QColor("#af84e8ff")
 LABEL_SEPARATOR = "|"
 DEFAULT_LABEL_COLUMN = "Label"
+ANNOTATIONS_SUFFIX = ".annotations.csv"
+# memory budget for a single parsed chunk when streaming files from disk
+CHUNK_BUDGET_BYTES = 64 * 1024**2
+CSV_SAMPLE_ROWS = 1000
+CSV_CHUNK_ROWS = 100_000
+# memory cap for columns of lazily read files kept in memory
+COLUMN_CACHE_BYTES = 2 * 1024**3
+# directory for binary copies of opened files, empty string disables it
+CACHE_DIR = os.environ.get(
+    "CHRONNOTATE_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".chronnotate", "cache"),
+)
+CACHE_MAX_BYTES = 50 * 1024**3
+# samples per bin at the finest level of detail and bins merged per level
+LOD_BASE_BIN = 8
+LOD_LEVEL_FACTOR = 4
+# minimum interval between coalesced view updates, about one display frame
+FRAME_INTERVAL_MS = 16
+# interval between updates of the rendering statistics shown over plots
+FRAME_STATS_INTERVAL_MS = 500
+# distance in pixels from an annotation within which it becomes editable
+REGION_HOVER_DISTANCE = 5
+# annotations are drawn "batched" by a single item, or as "items" created
+# for the annotations in view, when there are few enough of them
+REGION_RENDERING = os.environ.get("CHRONNOTATE_REGION_RENDERING", "batched")
+REGION_ITEMS_MAX = 200
+# fraction of the view width around it in which items are created
+REGION_ITEMS_MARGIN = 0.5
+# curves are drawn with this many times fewer points while regions are
+# dragged, 1 draws them at full detail
+DRAG_LOD_FACTOR = int(os.environ.get("CHRONNOTATE_DRAG_LOD_FACTOR", "1"))
+# directory for timing records of user actions, recording starts with the
+# application when set and can be toggled in the Settings menu
+LOG_DIR = os.environ.get("CHRONNOTATE_LOG_DIR", "")
+DEFAULT_LOG_DIR = os.path.join(os.path.expanduser("~"), ".chronnotate", "logs")
+# comma-separated names of recorded actions to run under cProfile, or "all"
+PROFILED_ACTIONS = [
+    name
+    for name in os.environ.get("CHRONNOTATE_PROFILE", "").split(",")
+    if name != ""
+]
@@ -0,0 +1,264 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .data_sources import ARROW_EXTENSIONS, PARQUET_EXTENSIONS, _import_pyarrow
+from .data_utils import label_codes
+from .settings import CSV_CHUNK_ROWS, DEFAULT_LABEL_COLUMN, LABEL_SEPARATOR
+
+LENGTH_DISTRIBUTIONS = ("fixed", "uniform", "exponential")
+
+
+def segment_intervals(
+    rows,
+    segments,
+    mean_length,
+    distribution="uniform",
+    labels=4,
+    multi_label=0.0,
+    rng=None,
+):
+    """Place non-overlapping labeled segments randomly in ``rows`` rows."""
+    rng = np.random.default_rng() if rng is None else rng
+    if distribution == "fixed":
+        lengths = np.full(segments, float(mean_length))
+    elif distribution == "uniform":
+        lengths = rng.uniform(0.5, 1.5, segments) * mean_length
+    elif distribution == "exponential":
+        lengths = rng.exponential(mean_length, segments)
+    else:
+        raise ValueError(f"Unknown length distribution {distribution}")
+    lengths = np.maximum(lengths, 1)
+    # rows are left for one row between segments, when there are enough
+    room = rows - segments if rows >= 2 * segments else rows
+    if lengths.sum() > room:
+        lengths *= room / lengths.sum()
+    lengths = np.floor(lengths).astype(np.int64)
+    # unlabeled rows are split randomly into gaps around the segments
+    free = rows - lengths.sum()
+    spacing = 1 if free >= segments else 0
+    cuts = np.sort(rng.integers(0, free - spacing * segments + 1, segments))
+    cuts += spacing * np.arange(segments)
+    starts = cuts + np.cumsum(lengths) - lengths
+    ends = starts + lengths
+
+    names = np.array([f"label {i}" for i in range(labels)], dtype=object)
+    first = rng.integers(labels, size=segments)
+    second = (first + rng.integers(1, max(labels, 2), size=segments)) % labels
+    multi = (rng.random(segments) < multi_label) & (labels > 1)
+    texts = np.where(
+        multi, names[first] + LABEL_SEPARATOR + names[second], names[first]
+    )
+    nonempty = lengths > 0
+    codes, categories = pd.factorize(texts[nonempty])
+    return starts[nonempty], ends[nonempty], codes, categories
+
+
+def gap_mask(length, gaps, gap_length, rows, rng):
+    """Mark rows of a chunk of ``length`` rows that fall into NaN gaps."""
+    mask = np.zeros(length, dtype=bool)
+    if gaps == 0 or gap_length == 0:
+        return mask
+    count = rng.poisson(gaps * length / max(rows, 1))
+    for start in rng.integers(-gap_length, max(length, 1), size=count):
+        mask[max(start, 0) : max(start + gap_length, 0)] = True
+    return mask
+
+
+def channel_values(t, channel, dtype, rng):
+    """Create values of a channel at sample indices ``t``."""
+    period = 200 + 37 * channel
+    values = (
+        np.sin(2 * np.pi * t / period)
+        + 0.3 * np.sin(2 * np.pi * t / (period * 13.7))
+        + 0.1 * rng.standard_normal(len(t))
+    )
+    dtype = np.dtype(dtype)
+    if dtype.kind in "iu":
+        info = np.iinfo(dtype)
+        scale = min(info.max, 2**20) / 4
+        offset = 0 if dtype.kind == "i" else 2 * scale
+        return np.rint(values * scale + offset).astype(dtype)
+    if dtype.kind == "b":
+        return values > 0
+    return values.astype(dtype)
+
+
+def iter_frames(
+    rows,
+    channels=8,
+    dtypes=("float64",),
+    gaps=0,
+    gap_length=100,
+    segments=100,
+    segment_length=1000,
+    length_distribution="uniform",
+    labels=4,
+    multi_label=0.0,
+    label_column=DEFAULT_LABEL_COLUMN,
+    chunk_rows=CSV_CHUNK_ROWS,
+    seed=0,
+):
+    """Iterate over frames of a synthetic recording with ``rows`` rows."""
+    starts, ends, codes, categories = segment_intervals(
+        rows,
+        segments,
+        segment_length,
+        length_distribution,
+        labels,
+        multi_label,
+        np.random.default_rng([seed, 0]),
+    )
+    names = [f"channel {i}" for i in range(channels)]
+    for chunk, offset in enumerate(range(0, rows, chunk_rows)):
+        length = min(chunk_rows, rows - offset)
+        rng = np.random.default_rng([seed, 1, chunk])
+        t = np.arange(offset, offset + length)
+        frame = {}
+        for i, name in enumerate(names):
+            values = channel_values(t, i, dtypes[i % len(dtypes)], rng)
+            if values.dtype.kind == "f":
+                values[gap_mask(length, gaps, gap_length, rows, rng)] = np.nan
+            frame[name] = values
+        frame[label_column] = pd.Categorical.from_codes(
+            label_codes(length, starts, ends, codes, offset),
+            categories=categories,
+        )
+        yield pd.DataFrame(frame, copy=False)
+
+
+def write_recording(path, frames, progress=None, rows=None):
+    """Write frames to file, choosing format by extension of ``path``."""
+    if path.lower().endswith(PARQUET_EXTENSIONS + ARROW_EXTENSIONS):
+        write = _write_arrow
+    else:
+        write = _write_csv
+    written = 0
+    for frame in write(path, frames):
+        written += len(frame)
+        if progress is not None and rows:
+            progress(written / rows)
+
+
+def _write_csv(path, frames):
+    with open(path, "w", newline="") as f:
+        for i, frame in enumerate(frames):
+            frame.to_csv(f, index=False, header=i == 0)
+            yield frame
+
+
+def _write_arrow(path, frames):
+    pa, _ = _import_pyarrow()
+    writer = None
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(
+                frame.astype(
+                    {
+                        col: object
+                        for col in frame.columns
+                        if isinstance(frame[col].dtype, pd.CategoricalDtype)
+                    }
+                ),
+                preserve_index=False,
+            )
+            if writer is None:
+                schema = pa.schema(
+                    [
+                        (
+                            pa.field(field.name, pa.string())
+                            if pa.types.is_null(field.type)
+                            or pa.types.is_string(field.type)
+                            else field
+                        )
+                        for field in table.schema
+                    ]
+                )
+                writer = _arrow_writer(path, schema)
+            writer.write_table(table.cast(schema))
+            yield frame
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _arrow_writer(path, schema):
+    pa, _ = _import_pyarrow()
+    if path.lower().endswith(PARQUET_EXTENSIONS):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(path, schema)
+    return pa.ipc.new_file(path, schema)
+
+
+def generate(path, rows, progress=None, **options):
+    """Write synthetic recording to ``path``, see :func:`iter_frames`."""
+    write_recording(path, iter_frames(rows, **options), progress, rows)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="chronnotate-generate",
+        description="Generate a synthetic recording with labeled segments "
+        "as CSV, Parquet or Arrow/Feather file, chosen by extension.",
+    )
+    parser.add_argument("output", help="file to write")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--channels", type=int, default=8)
+    parser.add_argument(
+        "--dtypes",
+        default="float64",
+        help="comma-separated dtypes cycled over channels, "
+        "e.g. float32,int16",
+    )
+    parser.add_argument(
+        "--gaps",
+        type=int,
+        default=0,
+        help="expected number of NaN gaps in each floating point channel",
+    )
+    parser.add_argument("--gap-length", type=int, default=100)
+    parser.add_argument("--segments", type=int, default=100)
+    parser.add_argument("--segment-length", type=float, default=1000)
+    parser.add_argument(
+        "--length-distribution",
+        choices=LENGTH_DISTRIBUTIONS,
+        default="uniform",
+    )
+    parser.add_argument(
+        "--labels", type=int, default=4, help="number of distinct labels"
+    )
+    parser.add_argument(
+        "--multi-label",
+        type=float,
+        default=0.0,
+        help="fraction of segments with two labels",
+    )
+    parser.add_argument(
+        "--label-column", default=DEFAULT_LABEL_COLUMN, help="label column"
+    )
+    parser.add_argument("--chunk-rows", type=int, default=CSV_CHUNK_ROWS)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = vars(args)
+    path, rows = options.pop("output"), options.pop("rows")
+    options["dtypes"] = tuple(args.dtypes.split(","))
+
+    def progress(fraction):
+        print(f"\r{fraction:.0%}", end="", file=sys.stderr, flush=True)
+
+    generate(path, rows, progress if sys.stderr.isatty() else None, **options)
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    print(f"{path}: {os.path.getsize(path)} bytes", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
-from PyQt6.QtCore import QSignalBlocker
+from PyQt6.QtCore import QObject, QSignalBlocker, QTimer
+
+from .settings import FRAME_INTERVAL_MS
 
 
 class SignalBlocker(QSignalBlocker):
@@ -15,3 +17,105 @@ class SignalBlocker(QSignalBlocker):
             super().__exit__(exc_type, exc_value, traceback)
         else:
             super().unblock()
+
+
+class ViewSync(QObject):
+    """Keep x range of a plot and region of an overview in sync per frame."""
+
+    def __init__(self, plot_widget, interval_ms=FRAME_INTERVAL_MS):
+        super().__init__()
+        self.plot_widget = plot_widget
+        self.region = None
+        self.pending = None
+        self._applying = False
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.apply)
+        self.counters = dict.fromkeys(
+            [
+                "region_changes",
+                "plot_changes",
+                "region_updates",
+                "plot_updates",
+            ],
+            0,
+        )
+
+    def attach(self, region):
+        self.detach()
+        self.region = region
+        self.region.sigRegionChanged.connect(self.region_changed)
+        self.plot_widget.sigRangeChanged.connect(self.plot_changed)
+        self.pending = "region"
+        self.apply()
+
+    def detach(self):
+        if self.region is None:
+            return
+        self.timer.stop()
+        self.pending = None
+        self.region.sigRegionChanged.disconnect(self.region_changed)
+        self.plot_widget.sigRangeChanged.disconnect(self.plot_changed)
+        self.region = None
+
+    def region_changed(self):
+        if not self._applying:
+            self.counters["region_changes"] += 1
+            self.schedule("region")
+
+    def plot_changed(self):
+        if not self._applying:
+            self.counters["plot_changes"] += 1
+            self.schedule("plot")
+
+    def schedule(self, source):
+        self.pending = source
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def apply(self):
+        source, self.pending = self.pending, None
+        self._applying = True
+        try:
+            if source == "region":
+                self.plot_widget.setXRange(*self.region.getRegion(), padding=0)
+                self.counters["plot_updates"] += 1
+            elif source == "plot":
+                self.region.setRegion(
+                    self.plot_widget.getViewBox().viewRange()[0]
+                )
+                self.counters["region_updates"] += 1
+        finally:
+            self._applying = False
+
+
+class FrameThrottle(QObject):
+    """Call a function at most once per frame with the latest arguments."""
+
+    def __init__(self, fn, interval_ms=FRAME_INTERVAL_MS):
+        super().__init__()
+        self.fn = fn
+        self.pending = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.flush)
+
+    def __call__(self, *args):
+        # the first call of a frame passes through, later ones wait for flush
+        if self.timer.isActive():
+            self.pending = args
+        else:
+            self.fn(*args)
+            self.timer.start()
+
+    def flush(self):
+        if self.pending is not None:
+            args, self.pending = self.pending, None
+            self.fn(*args)
+            self.timer.start()
+
+    def cancel(self):
+        self.timer.stop()
+        self.pending = None
@@ -0,0 +1,53 @@
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+from . import instrumentation
+
+
+class OperationCancelled(Exception):
+    """Raised by a worker function when the user cancels the operation."""
+
+
+class WorkerSignals(QObject):
+    progress = pyqtSignal(float)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+
+
+class Worker(QRunnable):
+    """Run function in thread pool with ``progress`` and ``is_cancelled``."""
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        action = instrumentation.start(
+            "task", function=getattr(self.fn, "__name__", repr(self.fn))
+        )
+        try:
+            result = self.fn(
+                *self.args,
+                progress=self.signals.progress.emit,
+                is_cancelled=self.is_cancelled,
+                **self.kwargs,
+            )
+        except OperationCancelled:
+            instrumentation.finish(action, status="cancelled")
+            self.signals.cancelled.emit()
+        except Exception as e:
+            instrumentation.finish(action, status="failed")
+            self.signals.failed.emit(e)
+        else:
+            instrumentation.finish(action, status="finished")
+            self.signals.finished.emit(result)
@@ -0,0 +1,147 @@
+import random
+
+import numpy as np
+import pytest
+from PyQt6.QtGui import QColor
+
+from chronnotate.annotations import (
+    Annotation,
+    AnnotationIndex,
+    LabelIndex,
+    label_ids,
+    label_mask,
+)
+
+RED = QColor("red")
+BLUE = QColor("blue")
+
+
+def annotation(start, end, labels=1, color=RED):
+    return Annotation(start, end, labels, color)
+
+
+def brute_overlapping(annotations, x_start, x_end):
+    return {
+        id(a) for a in annotations if a.end >= x_start and a.start <= x_end
+    }
+
+
+def test_label_mask_round_trip():
+    assert label_mask([0, 3, 5]) == 0b101001
+    assert list(label_ids(0b101001)) == [0, 3, 5]
+    assert list(label_ids(0)) == []
+
+
+def test_annotation_sorts_bounds():
+    a = annotation(10, 2)
+    assert (a.start, a.end) == (2, 10)
+
+
+def test_overlapping_finds_long_annotation_starting_far_before():
+    long = annotation(0, 1000)
+    index = AnnotationIndex([long] + [annotation(x, x + 1) for x in range(5)])
+    assert long in index.overlapping(900, 950)
+    assert index.at(999) == [long]
+
+
+def test_overlapping_after_longest_is_removed():
+    long = annotation(0, 1000)
+    short = annotation(500, 501)
+    index = AnnotationIndex([long, short])
+    index.remove(long)
+    assert index.overlapping(0, 1000) == [short]
+    assert index.overlapping(600, 700) == []
+
+
+def test_move_keeps_order_and_arrays():
+    a, b, c = annotation(0, 1), annotation(10, 11), annotation(20, 21)
+    index = AnnotationIndex([a, b, c])
+    index.move(a, 30, 25)
+    assert list(index) == [b, c, a]
+    assert (a.start, a.end) == (25, 30)
+    starts, ends = index.intervals()
+    np.testing.assert_array_equal(starts, [10, 20, 25])
+    np.testing.assert_array_equal(ends, [11, 21, 30])
+
+
+def test_remove_annotation_with_equal_start():
+    a, b, c = annotation(5, 6), annotation(5, 7), annotation(5, 8)
+    index = AnnotationIndex([a, b, c])
+    index.remove(b)
+    assert list(index) == [a, c]
+    assert index.position(c) == 1
+
+
+def test_next_and_previous():
+    a, b = annotation(0, 1), annotation(10, 11)
+    index = AnnotationIndex([b, a])
+    assert index.next(0) is b
+    assert index.next(10) is None
+    assert index.previous(10) is a
+    assert index.previous(0) is None
+
+
+def test_random_operations_match_brute_force():
+    rng = random.Random(0)
+    annotations = []
+    index = AnnotationIndex()
+    for step in range(500):
+        operation = rng.random()
+        if operation < 0.4 or len(annotations) == 0:
+            start = rng.uniform(0, 1000)
+            new = annotation(
+                start,
+                start + rng.expovariate(0.05),
+                color=rng.choice([RED, BLUE]),
+            )
+            annotations.append(new)
+            index.add(new)
+        elif operation < 0.6:
+            removed = annotations.pop(rng.randrange(len(annotations)))
+            index.remove(removed)
+        elif operation < 0.8:
+            start = rng.uniform(0, 1000)
+            index.move(
+                rng.choice(annotations), start, start + rng.uniform(0, 50)
+            )
+        else:
+            removed = rng.sample(annotations, min(3, len(annotations)))
+            for a in removed:
+                annotations.remove(a)
+            index.remove_all(removed)
+        x_start = rng.uniform(-10, 1010)
+        x_end = x_start + rng.uniform(0, 100)
+        assert set(map(id, index.overlapping(x_start, x_end))) == (
+            brute_overlapping(annotations, x_start, x_end)
+        )
+        starts, ends = index.intervals()
+        assert list(starts) == [a.start for a in index]
+        assert list(ends) == [a.end for a in index]
+        assert list(index.colors()) == [a.color.rgba() for a in index]
+        assert np.all(np.diff(starts) >= 0)
+    assert len(index) == len(annotations)
+
+
+def test_label_index_having():
+    a = annotation(0, 1, label_mask([0]))
+    b = annotation(2, 3, label_mask([0, 1]))
+    c = annotation(4, 5, label_mask([1]))
+    labels = LabelIndex()
+    for x in (a, b, c):
+        labels.add(x)
+    assert {id(x) for x in labels.get(0)} == {id(a), id(b)}
+    assert labels.having(label_mask([0, 1])) == [b]
+    assert labels.having(0) == []
+    labels.remove(b)
+    assert labels.having(label_mask([0, 1])) == []
+    assert 1 in labels
+    labels.remove(c)
+    assert 1 not in labels
+
+
+@pytest.mark.parametrize("count", [0, 1, 2])
+def test_remove_all_small(count):
+    annotations = [annotation(i, i + 1) for i in range(3)]
+    index = AnnotationIndex(annotations)
+    index.remove_all(annotations[:count])
+    assert list(index) == annotations[count:]
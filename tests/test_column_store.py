@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chronnotate.column_store import ColumnStore, ingest_csv, open_cached_csv
+
+
+def write_csv(path):
+    frame = pd.DataFrame(
+        {"a": np.arange(100, dtype=np.float64), "Label": ["x"] * 100}
+    )
+    frame.to_csv(path, index=False)
+    return frame
+
+
+def ingest_text(tmp_path, text, **options):
+    path = tmp_path / "data.csv"
+    path.write_text(text)
+    # one row per chunk, so that dtypes change between chunks
+    return ingest_csv(
+        str(path), label_column="Label", chunk_bytes=1, **options
+    )
+
+
+def test_ingest_promotes_dtype_within_file(tmp_path):
+    store = ingest_text(tmp_path, "a,b\n1,1\n2,\n3,2.5\n")
+    assert store["a"].dtype == np.int64
+    np.testing.assert_array_equal(store["a"], [1, 2, 3])
+    assert store["b"].dtype == np.float64
+    np.testing.assert_array_equal(store["b"], [1, np.nan, 2.5])
+
+
+def test_ingest_converts_numeric_column_to_text(tmp_path):
+    store = ingest_text(tmp_path, "a,Label\n1,walk\n2,\n3,1\nx,run\n")
+    assert not store.is_numeric("a")
+    assert list(store["a"]) == ["1", "2", "3", "x"]
+    # the label column is text even when its values look numeric
+    assert not store.is_numeric("Label")
+    labels = store["Label"]
+    assert list(labels[[0, 2, 3]]) == ["walk", "1", "run"]
+    assert pd.isna(labels[1])
+
+
+def test_ingest_compact_narrows_columns(tmp_path):
+    values = np.random.default_rng(0).standard_normal(5).astype(np.float32)
+    rows = "".join(f"{i - 2},{v!r}\n" for i, v in enumerate(values.tolist()))
+    store = ingest_text(tmp_path, "a,b\n" + rows + "300,\n", compact=True)
+    assert store["a"].dtype == np.int16
+    np.testing.assert_array_equal(store["a"], [-2, -1, 0, 1, 2, 300])
+    # floats written from float32 values are kept exactly
+    assert store["b"].dtype == np.float32
+    np.testing.assert_array_equal(store["b"][:-1], values)
+    assert np.isnan(store["b"][-1])
+
+
+def test_ingest_compact_keeps_values_not_fitting(tmp_path):
+    store = ingest_text(tmp_path, "a\n0.1\n1e300\n", compact=True)
+    assert store["a"].dtype == np.float64
+    np.testing.assert_array_equal(store["a"], [0.1, 1e300])
+
+
+def test_ingest_header_only(tmp_path):
+    store = ingest_text(tmp_path, "a,Label\n")
+    assert len(store) == 0
+    assert store.columns == ["a", "Label"]
+    assert len(store.to_frame()) == 0
+
+
+def test_store_frames_and_reopen(tmp_path):
+    rows = "".join(f"{i},{i / 2},{'ab'[i % 2]}\n" for i in range(10))
+    store = ingest_text(tmp_path, "a,b,Label\n" + rows)
+    # copied, as columns of the store are memory-mapped arrays
+    frame = store.to_frame().copy()
+    pd.testing.assert_frame_equal(
+        pd.concat(store.iter_frames(3), ignore_index=True), frame
+    )
+    reopened = ColumnStore(store.directory)
+    pd.testing.assert_frame_equal(reopened.to_frame().copy(), frame)
+    store.close()
+    with pytest.raises(FileNotFoundError):
+        ColumnStore(store.directory)
+
+
+def test_open_cached_csv_reuses_store(tmp_path):
+    frame = write_csv(tmp_path / "data.csv")
+    cache_dir = tmp_path / "cache"
+    for _ in range(2):
+        store = open_cached_csv(
+            str(tmp_path / "data.csv"),
+            label_column="Label",
+            cache_dir=cache_dir,
+        )
+        np.testing.assert_array_equal(store["a"], frame["a"])
+        assert not store.temporary
+        store.close()
+    assert len(list(cache_dir.iterdir())) == 1
+
+
+def test_open_cached_csv_falls_back_when_cache_is_not_writable(tmp_path):
+    frame = write_csv(tmp_path / "data.csv")
+    # a file in place of the cache directory
+    cache_dir = tmp_path / "cache"
+    cache_dir.write_text("")
+    store = open_cached_csv(
+        str(tmp_path / "data.csv"), label_column="Label", cache_dir=cache_dir
+    )
+    np.testing.assert_array_equal(store["a"], frame["a"])
+    assert store.temporary
+    store.close()
@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chronnotate import data_sources
+from chronnotate.column_store import ingest_csv
+from chronnotate.data_sources import (
+    ArrowSource,
+    ColumnCache,
+    LazyCsvSource,
+    open_data_source,
+    save_labeled_csv,
+)
+from chronnotate.workers import OperationCancelled
+
+
+def test_lazy_csv_rows_match_parser(tmp_path):
+    path = tmp_path / "data.csv"
+    # a quoted newline and trailing blank lines are not rows
+    path.write_text('value,note\n1,"a\nb"\n2,c\n\n\n')
+    source = LazyCsvSource(str(path))
+    assert len(source) == 2
+    np.testing.assert_array_equal(source["value"], [1, 2])
+    assert len(source.to_frame()) == 2
+
+
+def test_lazy_csv_compact_columns(tmp_path):
+    path = tmp_path / "data.csv"
+    values = np.random.default_rng(0).standard_normal(100).astype(np.float32)
+    # written with all digits of the float64 equal to each value
+    pd.DataFrame({"a": np.arange(100), "b": values.astype(np.float64)}).to_csv(
+        path, index=False
+    )
+    source = LazyCsvSource(str(path), compact=True)
+    assert source["a"].dtype == np.uint8
+    assert source["b"].dtype == np.float32
+    np.testing.assert_array_equal(source["b"], values)
+
+
+def write_data(path, rows):
+    frame = pd.DataFrame(
+        {"a": np.arange(rows), "b": np.arange(rows) / 2, "Label": "x"}
+    )
+    frame.to_csv(path, index=False)
+    return frame
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_save_labeled_csv_in_chunks(tmp_path, monkeypatch, lazy):
+    # three rows per chunk, so intervals cross chunk boundaries
+    monkeypatch.setattr(data_sources, "CHUNK_BUDGET_BYTES", 32 * 4 * 3)
+    path = str(tmp_path / "data.csv")
+    frame = write_data(path, 10)
+    if lazy:
+        data = LazyCsvSource(path, label_column="Label")
+    else:
+        data = ingest_csv(path, label_column="Label")
+    output = tmp_path / "labeled.csv"
+    fractions = []
+    save_labeled_csv(
+        str(output),
+        data,
+        "Label",
+        [1, 5, 8],
+        [4, 7, 10],
+        np.array(["walk", "run", "walk"], dtype=object),
+        progress=fractions.append,
+    )
+    saved = pd.read_csv(output, keep_default_na=False)
+    pd.testing.assert_frame_equal(saved[["a", "b"]], frame[["a", "b"]])
+    assert list(saved["Label"]) == [
+        "",
+        "walk",
+        "walk",
+        "walk",
+        "",
+        "run",
+        "run",
+        "",
+        "walk",
+        "walk",
+    ]
+    assert fractions == [0.3, 0.6, 0.9, 1.0]
+
+
+def test_save_labeled_csv_without_rows_writes_header(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n")
+    output = tmp_path / "labeled.csv"
+    save_labeled_csv(
+        str(output), LazyCsvSource(str(path)), "Label", [], [], []
+    )
+    assert output.read_text().strip() == "a,b,Label"
+
+
+def test_save_labeled_csv_cancelled_keeps_file(tmp_path):
+    path = str(tmp_path / "data.csv")
+    write_data(path, 10)
+    output = tmp_path / "labeled.csv"
+    output.write_text("old")
+    with pytest.raises(OperationCancelled):
+        save_labeled_csv(
+            str(output),
+            LazyCsvSource(path),
+            "Label",
+            [],
+            [],
+            [],
+            is_cancelled=lambda: True,
+        )
+    assert output.read_text() == "old"
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "data.csv",
+        "labeled.csv",
+    ]
+
+
+@pytest.mark.parametrize("name", ["data.parquet", "data.feather"])
+def test_arrow_source(tmp_path, name):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / name)
+    frame = pd.DataFrame(
+        {
+            "a": np.arange(10, dtype=np.int64),
+            "b": np.linspace(0, 1, 10),
+            "flag": np.arange(10) % 2 == 0,
+            "note": list("abcdefghij"),
+            "Label": ["1", None] * 5,
+        }
+    )
+    if name.endswith(".parquet"):
+        frame.to_parquet(path)
+    else:
+        frame.to_feather(path)
+    source = open_data_source(path, label_column="Label", compact=True)
+    assert isinstance(source, ArrowSource)
+    assert len(source) == 10
+    assert source.columns == list(frame.columns)
+    assert [source.is_numeric(col) for col in source.columns] == [
+        True,
+        True,
+        True,
+        False,
+        False,
+    ]
+    # the label column is read on opening, other columns on access
+    assert source.is_loaded("Label") and not source.is_loaded("a")
+    assert source["a"].dtype == np.uint8
+    np.testing.assert_array_equal(source["a"], frame["a"])
+    np.testing.assert_array_equal(source["b"], frame["b"])
+    assert list(source["note"]) == list(frame["note"])
+    labels = source["Label"]
+    assert labels[0] == "1" and pd.isna(labels[1])
+    pd.testing.assert_frame_equal(
+        pd.concat(source.iter_frames(3), ignore_index=True), frame
+    )
+
+
+def test_lazy_csv_source_reads_columns_on_demand(tmp_path):
+    path = str(tmp_path / "data.csv")
+    frame = write_data(path, 10)
+    source = open_data_source(path, label_column="Label", lazy=True)
+    assert isinstance(source, LazyCsvSource)
+    assert source.is_loaded("Label") and not source.is_loaded("a")
+    assert [source.is_numeric(col) for col in source.columns] == [
+        True,
+        True,
+        False,
+    ]
+    fractions = []
+    values = source.read_column("b", progress=fractions.append)
+    np.testing.assert_array_equal(values, frame["b"])
+    assert fractions[-1] == 1.0
+    assert not source.is_loaded("b")
+    np.testing.assert_array_equal(source["a"], frame["a"])
+    assert source.is_loaded("a")
+    assert list(source["Label"]) == ["x"] * 10
+    with pytest.raises(OperationCancelled):
+        source.read_column("a", is_cancelled=lambda: True)
+
+
+def test_column_cache_evicts_least_recently_used():
+    cache = ColumnCache(max_bytes=16)
+    cache.put("a", np.zeros(1))
+    cache.put("b", np.zeros(1))
+    cache.get("a")
+    cache.put("c", np.zeros(1))
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.nbytes == 16
+    # a column larger than the cap is kept on its own
+    cache.put("d", np.zeros(4))
+    assert "d" in cache and "a" not in cache and "c" not in cache
+    assert cache.nbytes == 32
+    cache.put("d", np.zeros(1))
+    assert cache.nbytes == 8
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chronnotate.data_utils import (
+    atomic_write,
+    compact_dtype,
+    find_subsegments,
+    label_codes,
+    read_annotations,
+    write_annotations,
+)
+
+
+@pytest.mark.parametrize(
+    "values, dtype",
+    [
+        ([0, 255], np.uint8),
+        ([-1, 127], np.int8),
+        ([-129, 0], np.int16),
+        (np.array([], dtype=np.int64), np.int8),
+        ([0.5, np.nan, -2.0], np.float32),
+        ([0.1], np.float64),
+        (np.array([1.5], dtype=np.float32), np.float32),
+        ([True, False], np.bool_),
+    ],
+)
+def test_compact_dtype(values, dtype):
+    assert compact_dtype(values) == dtype
+
+
+def test_find_subsegments_of_array():
+    starts, ends, codes, categories = find_subsegments(
+        ["a", "a", None, "b", "b", "a", None]
+    )
+    np.testing.assert_array_equal(starts, [0, 3, 5])
+    np.testing.assert_array_equal(ends, [2, 5, 6])
+    assert list(categories[codes]) == ["a", "b", "a"]
+
+
+def test_find_subsegments_of_categorical():
+    labels = pd.Categorical.from_codes([-1, 1, 1, 0], categories=["x", "y"])
+    starts, ends, codes, categories = find_subsegments(labels)
+    np.testing.assert_array_equal(starts, [1, 3])
+    np.testing.assert_array_equal(ends, [3, 4])
+    assert list(categories[codes]) == ["y", "x"]
+
+
+def test_find_subsegments_empty():
+    starts, ends, codes, _ = find_subsegments([])
+    assert len(starts) == len(ends) == len(codes) == 0
+
+
+def test_label_codes_round_trip():
+    labels = np.array([-1, 0, 0, 1, -1, -1, 2, 2, 2, -1])
+    starts, ends, codes, _ = find_subsegments(
+        pd.Categorical.from_codes(labels, categories=["a", "b", "c"])
+    )
+    np.testing.assert_array_equal(
+        label_codes(len(labels), starts, ends, codes), labels
+    )
+
+
+def test_label_codes_by_chunks():
+    starts, ends, codes = [1, 5], [4, 9], [0, 1]
+    whole = label_codes(10, starts, ends, codes)
+    chunks = np.concatenate(
+        [label_codes(3, starts, ends, codes, offset) for offset in (0, 3, 6)]
+        + [label_codes(1, starts, ends, codes, 9)]
+    )
+    np.testing.assert_array_equal(chunks, whole)
+    np.testing.assert_array_equal(whole, [-1, 0, 0, 0, -1, 1, 1, 1, 1, -1])
+
+
+def test_label_codes_later_overlapping_intervals_win():
+    result = label_codes(6, [0, 2], [4, 6], [0, 1])
+    np.testing.assert_array_equal(result, [0, 0, 1, 1, 1, 1])
+
+
+def test_label_codes_ignores_empty_and_clips_intervals():
+    result = label_codes(4, [3, -2, 2], [3, 1, 10], [5, 0, 1])
+    np.testing.assert_array_equal(result, [0, -1, 1, 1])
+
+
+def test_annotations_round_trip(tmp_path):
+    path = tmp_path / "data.annotations.csv"
+    labels = np.array(["NA", "", "walk;run"], dtype=object)
+    write_annotations(path, [0, 5, 9], [4, 8, 12], labels)
+    starts, ends, read_labels = read_annotations(path)
+    np.testing.assert_array_equal(starts, [0, 5, 9])
+    np.testing.assert_array_equal(ends, [4, 8, 12])
+    assert list(read_labels) == list(labels)
+
+
+def test_atomic_write_keeps_file_on_error(tmp_path):
+    path = tmp_path / "file.csv"
+    path.write_text("old")
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as f:
+            f.write("new")
+            raise RuntimeError()
+    assert path.read_text() == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["file.csv"]
+    with atomic_write(path) as f:
+        f.write("new")
+    assert path.read_text() == "new"
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from chronnotate.decimation import MinMaxPyramid
+
+
+def test_levels_hold_extremes_of_bins():
+    values = np.arange(100, dtype=np.float64)
+    pyramid = MinMaxPyramid(values, base=4, factor=2)
+    mins, maxs = pyramid.levels[0]
+    np.testing.assert_array_equal(mins, values[::4])
+    np.testing.assert_array_equal(maxs, values[3::4])
+    # the last level is a single bin of all values
+    assert pyramid.levels[-1][0][0] == 0
+    assert pyramid.levels[-1][1][0] == 99
+    assert pyramid.bounds == (0, 99)
+
+
+def test_levels_ignore_nans_and_keep_dtype():
+    values = np.array([np.nan, 1, 5, np.nan, -2, np.nan], dtype=np.float32)
+    pyramid = MinMaxPyramid(values, base=2, factor=2)
+    mins, maxs = pyramid.levels[0]
+    assert mins.dtype == np.float32
+    np.testing.assert_array_equal(mins, [1, 5, -2])
+    np.testing.assert_array_equal(maxs, [1, 5, -2])
+    assert pyramid.bounds == (-2, 5)
+
+
+def test_all_nan_bounds():
+    pyramid = MinMaxPyramid(np.full(10, np.nan), base=4)
+    assert pyramid.bounds == (0, 0)
+
+
+def test_empty():
+    pyramid = MinMaxPyramid(np.array([], dtype=np.float64))
+    assert pyramid.levels == []
+    x, y = pyramid.decimate(0, 100, 10)
+    assert len(x) == len(y) == 0
+
+
+def test_decimate_returns_raw_samples_when_zoomed_in():
+    values = np.random.default_rng(0).standard_normal(1000)
+    pyramid = MinMaxPyramid(values, base=8)
+    x, y = pyramid.decimate(100.5, 200.2, 1000)
+    np.testing.assert_array_equal(x, np.arange(100, 202))
+    np.testing.assert_array_equal(y, values[100:202])
+
+
+@pytest.mark.parametrize("pixels", [10, 100, 1000])
+def test_decimate_keeps_peaks_and_bounds_points(pixels):
+    values = np.random.default_rng(1).standard_normal(100_000)
+    values[12345] = 100
+    values[54321] = -100
+    pyramid = MinMaxPyramid(values, base=8, factor=4)
+    x, y = pyramid.decimate(0, len(values), pixels)
+    assert y.max() == 100 and y.min() == -100
+    assert pixels <= len(y) // 2 <= 4 * pixels + 1
+    assert np.all(np.diff(x) >= 0)
+
+
+def test_boolean_values():
+    pyramid = MinMaxPyramid(np.array([True, False] * 20), base=4)
+    np.testing.assert_array_equal(pyramid.levels[0][0], 0)
+    np.testing.assert_array_equal(pyramid.levels[0][1], 1)
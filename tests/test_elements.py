@@ -0,0 +1,16 @@
+from chronnotate.annotations import label_mask
+from chronnotate.elements import ColorItemElement, ColorItemModel
+from chronnotate.settings import LABEL_SEPARATOR
+
+
+def test_label_text_is_sorted_by_label():
+    model = ColorItemModel([ColorItemElement("walk"), ColorItemElement("run")])
+    model.removeItem(0)
+    # the id of the removed label is reused by the new one
+    model.insertItem(ColorItemElement("sit"))
+    ids = [item.label_id for item in model.items]
+    assert model.label_text(label_mask(ids)) == LABEL_SEPARATOR.join(
+        ["run", "sit"]
+    )
+    assert model.label_text(label_mask(ids[:1])) == "run"
+    assert model.label_text(0) == ""
@@ -0,0 +1,26 @@
+import pyqtgraph as pg
+
+from chronnotate.utils import ViewSync
+
+
+def test_view_sync_attach_twice_and_detach(qapp):
+    plot = pg.PlotWidget()
+    sync = ViewSync(plot, interval_ms=0)
+    sync.attach(pg.LinearRegionItem([0, 10]))
+    sync.attach(pg.LinearRegionItem([0, 10]))
+    sync.detach()
+    sync.detach()
+    plot.setXRange(5, 50, padding=0)
+    qapp.processEvents()
+    assert sync.counters["plot_changes"] == 0
+
+
+def test_view_sync_updates_region(qapp):
+    plot = pg.PlotWidget()
+    region = pg.LinearRegionItem([0, 10])
+    sync = ViewSync(plot, interval_ms=0)
+    sync.attach(region)
+    plot.setXRange(5, 50, padding=0)
+    sync.apply()
+    assert region.getRegion() == (5, 50)
+    assert sync.counters["region_updates"] == 1